@@ -0,0 +1,56 @@
+import argparse
+import asyncio
+import itertools
+import time
+
+from bench.http_server import json_response, serve_forever
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+
+
+# Answers the Bot API methods the bot calls with plausible results. Point the
+# bot at it with base_url='http://host:port/bot'.
+class FakeBotAPI:
+    def __init__(self):
+        self.message_ids = itertools.count(1)
+        self.calls = {}
+
+    def _message(self, params, message_id=None):
+        return {
+            'message_id': message_id or next(self.message_ids),
+            'date': int(time.time()),
+            'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+            'from': BOT_USER,
+            'text': params.get('text', ''),
+        }
+
+    def __call__(self, request):
+        # Paths look like /bot<token>/<method>
+        method = request.path.rsplit('/', 1)[-1]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        params = request.params
+        if method == 'getMe':
+            result = BOT_USER
+        elif method == 'sendMessage':
+            result = self._message(params)
+        elif method == 'editMessageText':
+            result = self._message(params, int(params.get('message_id', 0)))
+        elif method == 'getStats':
+            # Not a Bot API method; lets the runner count what the bot sent
+            result = self.calls
+        else:
+            result = True
+        return json_response({'ok': True, 'result': result})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Telegram Bot API for benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    args = parser.parse_args()
+    asyncio.run(serve_forever(FakeBotAPI(), args.host, args.port, args.latency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+
+from bench.http_server import json_response, serve_forever, text_response
+
+STATES = ('uploading', 'uploading', 'stalledUP', 'downloading', 'stalledDL', 'pausedUP', 'error')
+CATEGORIES = ('', 'tv', 'movies', 'music')
+# Extension of the files /move_specific is benchmarked on; the runner creates them on disk
+MOVE_EXTENSION = 'bench'
+
+
+def torrent_hash(i):
+    return hashlib.sha1(f'bench-torrent-{i}'.encode()).hexdigest()
+
+
+def generate(count, files_per_torrent, movable, save_path, seed=0):
+    # Returns (torrents by hash, file lists by hash), the first `movable`
+    # torrents get one extra *.bench file for /move_specific
+    rng = random.Random(seed)
+    now = int(time.time())
+    torrents = {}
+    files = {}
+    for i in range(count):
+        state = STATES[i % len(STATES)]
+        name = f'Bench Torrent {i:06d}'
+        file_list = [
+            {'index': j, 'name': f'{name}/file{j:03d}.mkv', 'size': rng.randint(1, 4) << 28, 'progress': 1.0, 'priority': 1}
+            for j in range(files_per_torrent)
+        ]
+        if i < movable:
+            file_list.append({'index': len(file_list), 'name': f'{name}/sample.{MOVE_EXTENSION}', 'size': 0, 'progress': 1.0, 'priority': 1})
+        size = sum(file['size'] for file in file_list)
+        progress = 1.0 if state.endswith('UP') or state == 'uploading' else round(rng.random(), 3)
+        torrents[torrent_hash(i)] = {
+            'name': name,
+            'size': size,
+            'total_size': size,
+            'progress': progress,
+            'state': state,
+            'dlspeed': 0 if progress >= 1 else rng.randint(0, 10 << 20),
+            'upspeed': rng.randint(0, 1 << 20),
+            'ratio': round(rng.uniform(0, 5), 2),
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'tags': 'bench' if i % 2 else '',
+            'tracker': 'http://tracker.example/announce',
+            'save_path': save_path,
+            'content_path': f'{save_path}/{name}',
+            'added_on': now - rng.randint(0, 400 * 86400),
+            'completion_on': now if progress >= 1 else 0,
+            'num_seeds': rng.randint(0, 50),
+            'eta': 8640000 if progress >= 1 else rng.randint(60, 86400),
+        }
+        files[torrent_hash(i)] = file_list
+    return torrents, files
+
+
+# In-memory stand-in for the qBittorrent WebUI: the endpoints the bot uses,
+# with /sync/maindata deltas that change `churn` torrents per request.
+class FakeQBittorrent:
+    def __init__(self, torrents, files, churn=10, seed=0):
+        self.torrents = torrents
+        self.files = files
+        self.churn = churn
+        self.rng = random.Random(seed)
+        self.rid = 0
+        self.changed = {}
+        self.removed = []
+        self.routes = {
+            '/api/v2/auth/login': self.login,
+            '/api/v2/auth/logout': lambda request: text_response('Ok.'),
+            '/api/v2/app/version': lambda request: text_response('v4.6.5'),
+            '/api/v2/app/webapiVersion': lambda request: text_response('2.9.3'),
+            '/api/v2/sync/maindata': self.maindata,
+            '/api/v2/torrents/info': self.info,
+            '/api/v2/torrents/files': self.torrent_files,
+            '/api/v2/torrents/delete': self.delete,
+            '/api/v2/torrents/pause': self.set_state('pausedUP'),
+            '/api/v2/torrents/resume': self.set_state('uploading'),
+            '/api/v2/torrents/setLocation': self.set_location,
+            '/api/v2/torrents/renameFile': lambda request: text_response(''),
+            '/api/v2/torrents/add': lambda request: text_response('Ok.'),
+        }
+
+    def __call__(self, request):
+        route = self.routes.get(request.path)
+        if route is None:
+            return text_response('Not Found', status=404)
+        return route(request)
+
+    def login(self, request):
+        return text_response('Ok.', headers={'Set-Cookie': 'SID=bench; HttpOnly; path=/'})
+
+    def _hashes(self, request):
+        hashes = request.params.get('hashes') or request.params.get('hash') or ''
+        if hashes == 'all':
+            return list(self.torrents)
+        return [torrent_hash for torrent_hash in hashes.split('|') if torrent_hash in self.torrents]
+
+    def _touch(self, torrent_hash, changes):
+        self.torrents[torrent_hash].update(changes)
+        self.changed.setdefault(torrent_hash, {}).update(changes)
+
+    def maindata(self, request):
+        client_rid = int(request.params.get('rid', 0))
+        # Simulate transfer activity on a few torrents per request
+        for torrent_hash in self.rng.sample(list(self.torrents), min(self.churn, len(self.torrents))):
+            torrent = self.torrents[torrent_hash]
+            self._touch(torrent_hash, {'upspeed': self.rng.randint(0, 1 << 20), 'ratio': round(torrent['ratio'] + 0.01, 2)})
+
+        if client_rid != self.rid or client_rid == 0:
+            data = {'full_update': True, 'torrents': self.torrents, 'server_state': {'dl_info_speed': 0, 'up_info_speed': 0}}
+        else:
+            data = {'torrents': self.changed, 'torrents_removed': self.removed}
+        self.rid += 1
+        self.changed = {}
+        self.removed = []
+        data['rid'] = self.rid
+        return json_response(data)
+
+    def info(self, request):
+        hashes = self._hashes(request) if 'hashes' in request.params else list(self.torrents)
+        return json_response([dict(self.torrents[torrent_hash], hash=torrent_hash) for torrent_hash in hashes])
+
+    def torrent_files(self, request):
+        torrent_hash = request.params.get('hash')
+        if torrent_hash not in self.files:
+            return text_response('Torrent hash was not found', status=404)
+        return json_response(self.files[torrent_hash])
+
+    def delete(self, request):
+        for torrent_hash in self._hashes(request):
+            del self.torrents[torrent_hash]
+            self.files.pop(torrent_hash, None)
+            self.changed.pop(torrent_hash, None)
+            self.removed.append(torrent_hash)
+        return text_response('')
+
+    def set_state(self, state):
+        def handler(request):
+            for torrent_hash in self._hashes(request):
+                self._touch(torrent_hash, {'state': state})
+            return text_response('')
+        return handler
+
+    def set_location(self, request):
+        for torrent_hash in self._hashes(request):
+            self._touch(torrent_hash, {'save_path': request.params.get('location', '')})
+        return text_response('')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake qBittorrent WebUI for benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--torrents', type=int, default=1000)
+    parser.add_argument('--files', type=int, default=10, help='files per torrent')
+    parser.add_argument('--movable', type=int, default=100, help='torrents with a *.bench file for /move_specific')
+    parser.add_argument('--save-path', default='/tmp/bench-downloads')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--churn', type=int, default=10, help='torrents changed per /sync/maindata request')
+    args = parser.parse_args()
+
+    torrents, files = generate(args.torrents, args.files, args.movable, args.save_path)
+    asyncio.run(serve_forever(FakeQBittorrent(torrents, files, churn=args.churn), args.host, args.port, args.latency))
+
+
+if __name__ == '__main__':
+    main()
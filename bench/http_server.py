@@ -0,0 +1,90 @@
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qsl, urlsplit
+
+logger = logging.getLogger(__name__)
+
+REASONS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 409: 'Conflict'}
+
+
+class Request:
+    def __init__(self, method, target, headers, body):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path
+        self.headers = headers
+        self.body = body
+        self.params = dict(parse_qsl(url.query))
+        content_type = headers.get('content-type', '')
+        if content_type.startswith('application/x-www-form-urlencoded'):
+            self.params.update(parse_qsl(body.decode()))
+        elif content_type.startswith('application/json') and body:
+            self.params.update(json.loads(body))
+        elif content_type.startswith('multipart/form-data'):
+            self.params.update(_parse_multipart(body, content_type))
+
+
+def _parse_multipart(body, content_type):
+    # Only plain text fields are needed by the fakes; file parts are skipped
+    boundary = content_type.split('boundary=', 1)[1].strip('"').encode()
+    fields = {}
+    for part in body.split(b'--' + boundary):
+        head, _, value = part.partition(b'\r\n\r\n')
+        if b'name="' not in head or b'filename=' in head:
+            continue
+        name = head.split(b'name="', 1)[1].split(b'"', 1)[0].decode()
+        fields[name] = value.rstrip(b'\r\n').decode(errors='replace')
+    return fields
+
+
+def json_response(data, status=200, headers=None):
+    return status, dict(headers or {}, **{'Content-Type': 'application/json'}), json.dumps(data).encode()
+
+
+def text_response(text, status=200, headers=None):
+    return status, dict(headers or {}, **{'Content-Type': 'text/plain'}), text.encode()
+
+
+async def _serve(handler, latency, reader, writer):
+    # HTTP/1.1 with keep-alive, enough for requests and httpx clients
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+            if latency:
+                await asyncio.sleep(latency)
+            try:
+                status, response_headers, payload = handler(Request(method, target, headers, body))
+            except Exception as e:
+                logger.exception(f"Fake server handler failed: {e}")
+                status, response_headers, payload = text_response(str(e), status=400)
+            head = [f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}", f"Content-Length: {len(payload)}"]
+            head.extend(f"{name}: {value}" for name, value in response_headers.items())
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + payload)
+            await writer.drain()
+            if headers.get('connection', '').lower() == 'close':
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_forever(handler, host, port, latency=0.0):
+    # Prints the bound port so the benchmark runner knows when the server is up
+    server = await asyncio.start_server(lambda reader, writer: _serve(handler, latency, reader, writer), host, port)
+    print(f"listening {server.sockets[0].getsockname()[1]}", flush=True)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.fake_qbittorrent import MOVE_EXTENSION, torrent_hash
+
+# Offline benchmark: starts the fake qBittorrent WebUI and fake Bot API in
+# subprocesses, points the bot at them and drives its command handlers.
+#
+#   python -m bench.run --torrents 10000 --files 10 --qb-latency 0.005
+#   python -m bench.run --torrents 10000 --compare bench/results/<earlier run>.json
+
+BENCH_USER = 100000
+TOKEN = '123456:bench'
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def start_server(module, *args):
+    process = subprocess.Popen([sys.executable, '-m', module, *map(str, args)], stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith('listening '):
+        process.kill()
+        raise RuntimeError(f'{module} failed to start')
+    return process, int(line.split()[1])
+
+
+def configure(qb_port, bot_rate, state_dir):
+    # The bot reads config at import time, so this runs before new_main is imported
+    import config
+    config.QBITTORRENT_HOST = f'http://127.0.0.1:{qb_port}'
+    config.QBITTORRENT_USERNAME = 'admin'
+    config.QBITTORRENT_PASSWORD = 'bench'
+    config.ALLOWED_USERS = [BENCH_USER + i for i in range(1000)]
+    config.ADMIN_USERS = []
+    config.TELEGRAM_GLOBAL_RATE = bot_rate
+    config.TELEGRAM_PER_CHAT_RATE = bot_rate
+    config.MOVE_MODE = 'filesystem'
+    config.METRICS_PORT = None
+    config.SNAPSHOT_FILE = os.path.join(state_dir, 'cache_snapshot.pickle')
+    config.PERSISTENCE_FILE = os.path.join(state_dir, 'bot_state.pickle')
+    config.PIPELINE_STATE_FILE = os.path.join(state_dir, 'pipeline_jobs.json')
+
+
+class Driver:
+    def __init__(self, bot, application):
+        from telegram import Update
+        from telegram.ext import CallbackContext
+        self.Update = Update
+        self.CallbackContext = CallbackContext
+        self.bot = bot
+        self.application = application
+        self.update_ids = iter(range(1, 1 << 62))
+
+    def make_call(self, user_id, command, args):
+        update_id = next(self.update_ids)
+        update = self.Update.de_json({
+            'update_id': update_id,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': {'id': user_id, 'is_bot': False, 'first_name': 'bench'},
+                'text': ' '.join([f'/{command}', *args]),
+            },
+        }, self.bot)
+        context = self.CallbackContext.from_update(update, self.application)
+        context.args = list(args)
+        return update, context
+
+    async def drive(self, handler, command, arg_lists, concurrency):
+        # Runs handler once per argument list with `concurrency` simulated users
+        pending = list(arg_lists)
+        latencies = []
+
+        async def user(user_id):
+            while pending:
+                args = pending.pop()
+                update, context = self.make_call(user_id, command, args)
+                started = time.perf_counter()
+                await handler(update, context)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(BENCH_USER + i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        return {
+            'count': len(latencies),
+            'seconds': round(elapsed, 3),
+            'ops_per_second': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 0.5) * 1e3, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1e3, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1e3, 2),
+            'max_ms': round(max(latencies, default=0) * 1e3, 2),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+        }
+
+
+def create_movable_files(save_path, movable):
+    for i in range(movable):
+        directory = os.path.join(save_path, f'Bench Torrent {i:06d}')
+        os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, f'sample.{MOVE_EXTENSION}'), 'w').close()
+
+
+async def run_benchmarks(args, bot_port, save_path, work_dir):
+    from telegram import Bot
+    from telegram.ext import Application
+    import new_main as bot_module
+
+    bot = Bot(TOKEN, base_url=f'http://127.0.0.1:{bot_port}/bot')
+    await bot.initialize()
+    application = Application.builder().bot(bot).build()
+    bot_module.send_queue.start(bot)
+    driver = Driver(bot, application)
+    rng = random.Random(0)
+    results = {}
+
+    # The first command pays for login and the initial full /sync/maindata
+    results['cold_status'] = await driver.drive(bot_module.status, 'status', [[]], 1)
+    bot_module.torrent_cache.start()
+
+    results['status'] = await driver.drive(
+        bot_module.status, 'status',
+        [rng.choice([[], ['seeding'], ['downloading']]) for _ in range(args.iterations)],
+        args.concurrency,
+    )
+    results['list_files'] = await driver.drive(
+        bot_module.list_files, 'list',
+        [[torrent_hash(rng.randrange(args.torrents))] for _ in range(args.iterations)],
+        args.concurrency,
+    )
+    # Removal runs on the newest torrents so the movable ones stay around
+    removals = min(args.iterations, max(0, args.torrents - args.movable))
+    results['remove_torrent'] = await driver.drive(
+        bot_module.remove_torrent, 'remove',
+        [[torrent_hash(args.torrents - 1 - i)] for i in range(removals)],
+        args.concurrency,
+    )
+
+    move_results = []
+    for run in range(args.move_runs):
+        create_movable_files(save_path, args.movable)
+        destination = os.path.join(work_dir, f'moved-{run}')
+        os.makedirs(destination)
+        move_results.append(await driver.drive(bot_module.move_specific_file, 'move_specific', [[f'*.{MOVE_EXTENSION}', destination]], 1))
+    if move_results:
+        results['move_specific_file'] = {
+            'runs': len(move_results),
+            'files_per_run': args.movable,
+            'p50_ms': round(percentile([result['p50_ms'] for result in move_results], 0.5), 2),
+            'max_ms': max(result['max_ms'] for result in move_results),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+        }
+
+    await bot_module.torrent_cache.stop()
+    await bot.shutdown()
+    bot_module.move_engine.shutdown()
+    bot_module.aqb.shutdown()
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for key in ('ops_per_second', 'p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_mb'):
+            if key in result and before.get(key):
+                change = (result[key] - before[key]) / before[key]
+                print(f"{name:20} {key:15} {before[key]:>10} -> {result[key]:>10} ({change:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the bot against fake qBittorrent and Telegram servers')
+    parser.add_argument('--torrents', type=int, default=1000)
+    parser.add_argument('--files', type=int, default=10, help='files per torrent')
+    parser.add_argument('--movable', type=int, default=100, help='files moved by each /move_specific run')
+    parser.add_argument('--iterations', type=int, default=200, help='calls per command')
+    parser.add_argument('--concurrency', type=int, default=8, help='simulated users sending commands at once')
+    parser.add_argument('--move-runs', type=int, default=3)
+    parser.add_argument('--qb-latency', type=float, default=0.0, help='seconds added to every qBittorrent response')
+    parser.add_argument('--bot-latency', type=float, default=0.0, help='seconds added to every Bot API response')
+    parser.add_argument('--telegram-rate', type=float, default=1000, help='send queue rate limits, high so the bot itself is measured')
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(__file__), 'results'))
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='telbot-bench-') as work_dir:
+        save_path = os.path.join(work_dir, 'downloads')
+        qb_process, qb_port = start_server(
+            'bench.fake_qbittorrent', '--torrents', args.torrents, '--files', args.files, '--movable', args.movable,
+            '--save-path', save_path, '--latency', args.qb_latency,
+        )
+        bot_process, bot_port = start_server('bench.fake_bot_api', '--latency', args.bot_latency)
+        try:
+            configure(qb_port, args.telegram_rate, work_dir)
+            results = asyncio.run(run_benchmarks(args, bot_port, save_path, work_dir))
+        finally:
+            qb_process.kill()
+            bot_process.kill()
+
+    for name, result in results.items():
+        print(f"{name:20} " + ' '.join(f"{key}={value}" for key, value in result.items()))
+
+    os.makedirs(args.output, exist_ok=True)
+    output_path = os.path.join(args.output, f"{time.strftime('%Y%m%d-%H%M%S')}-{args.torrents}x{args.files}.json")
+    with open(output_path, 'w') as f:
+        json.dump({
+            'parameters': vars(args),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }, f, indent=2)
+    print(f"Results saved to {output_path}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import hashlib
+
+# Just enough bencode to find the `info` dictionary of a .torrent file and
+# hash it; nothing is decoded beyond the keys needed to walk the structure.
+
+
+class BencodeError(ValueError):
+    pass
+
+
+def _skip(data, i):
+    # Returns the index just past the value starting at i
+    token = data[i:i + 1]
+    if token == b'i':
+        end = data.index(b'e', i)
+        return end + 1
+    if token in (b'l', b'd'):
+        i += 1
+        while data[i:i + 1] != b'e':
+            if not data[i:i + 1]:
+                raise BencodeError('unterminated list or dictionary')
+            i = _skip(data, i)
+        return i + 1
+    if token.isdigit():
+        colon = data.index(b':', i)
+        return colon + 1 + int(data[i:colon])
+    raise BencodeError(f'unexpected byte {token!r} at {i}')
+
+
+def _read_string(data, i):
+    colon = data.index(b':', i)
+    start = colon + 1
+    end = start + int(data[i:colon])
+    return data[start:end], end
+
+
+def info_hash(data):
+    # v1 info-hash (hex SHA-1 of the bencoded info dictionary)
+    data = bytes(data)
+    try:
+        if data[:1] != b'd':
+            raise BencodeError('torrent file is not a dictionary')
+        i = 1
+        while data[i:i + 1] != b'e':
+            key, i = _read_string(data, i)
+            end = _skip(data, i)
+            if key == b'info':
+                return hashlib.sha1(data[i:end]).hexdigest()
+            i = end
+    except BencodeError:
+        raise
+    except (IndexError, ValueError) as e:
+        raise BencodeError(f'malformed torrent file: {e}') from e
+    raise BencodeError('torrent file has no info dictionary')
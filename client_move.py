@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(path):
+    return os.path.normpath(path).rstrip(os.sep)
+
+
+def _is_within(path, directory):
+    path, directory = _normalize(path), _normalize(directory)
+    return path == directory or path.startswith(directory + os.sep)
+
+
+# Result of a move done by qBittorrent itself; same shape as mover.MoveJob
+class ClientMoveJob:
+    def __init__(self):
+        self.moved = []
+        self.failed = []
+        self.relocating = {}
+        self.started_at = time.monotonic()
+        # Set while qBittorrent is still relocating torrents in the background
+        self.task = None
+
+    def describe(self, torrent_cache):
+        pending = [
+            torrent_hash for torrent_hash, destination_path in self.relocating.items()
+            if not isinstance(destination_path, Exception)
+            and torrent_cache.torrents.get(torrent_hash, {}).get('state') == 'moving'
+        ]
+        done = len(self.relocating) - len(pending)
+        return f"qBittorrent is moving torrents: {done}/{len(self.relocating)} done"
+
+
+# Moves matched files through the Web API so qBittorrent keeps tracking the
+# data and seeding continues without a recheck:
+#  - a destination inside the torrent's save path becomes torrents_rename_file
+#  - anything else relocates the whole torrent with one torrents_set_location
+#    call per destination, carrying every affected hash. That is refused when
+#    the pattern matches only some of a torrent's files, since the others
+#    would move too. Relocation can take hours, so with `on_done` it is
+#    awaited in the background and `on_done(job)` reports the result.
+class ClientMover:
+    def __init__(self, aqb, torrent_cache, file_cache=None, poll_interval=3, timeout=6 * 3600):
+        self.aqb = aqb
+        self.torrent_cache = torrent_cache
+        self.file_cache = file_cache
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.tasks = set()
+
+    async def _rename(self, job, torrent, entry, destination_path):
+        new_path = os.path.join(os.path.relpath(destination_path, torrent['save_path']), entry.basename)
+        new_path = os.path.normpath(new_path).replace(os.sep, '/')
+        try:
+            await self.aqb.torrents_rename_file(torrent_hash=torrent['hash'], old_path=entry.name, new_path=new_path)
+            job.moved.append((os.path.join(torrent['save_path'], entry.name), os.path.join(torrent['save_path'], new_path)))
+        except Exception as e:
+            job.failed.append((entry.name, e))
+
+    async def _set_location(self, job, torrents, destination_path):
+        try:
+            await self.aqb.torrents_set_location(location=destination_path, torrent_hashes='|'.join(torrents))
+        except Exception as e:
+            job.failed.extend((torrent['name'], e) for torrent in torrents.values())
+            return
+        for torrent_hash in torrents:
+            job.relocating[torrent_hash] = destination_path
+
+    async def _refuse_partial(self, job, relocations):
+        if self.file_cache is None:
+            return
+        files = await self.file_cache.get_many(list(relocations))
+        for torrent_hash, (torrent, _, entries) in list(relocations.items()):
+            if len(entries) < len(files.get(torrent_hash, entries)):
+                error = ValueError('only some files of the torrent match; in client mode only whole torrents can be moved outside their save path')
+                job.failed.extend((entry.name, error) for entry in entries)
+                del relocations[torrent_hash]
+
+    async def move(self, matches, destination_path, progress_message=None, on_done=None):
+        # `matches` is a list of (torrent, file index entry)
+        job = ClientMoveJob()
+        renames = []
+        relocations = {}
+        for torrent, entry in matches:
+            if _is_within(destination_path, torrent['save_path']):
+                renames.append(self._rename(job, torrent, entry, destination_path))
+            else:
+                # Remember the old save path, the cached torrent dict is updated in place
+                relocations.setdefault(torrent['hash'], (torrent, torrent['save_path'], []))[2].append(entry)
+
+        await asyncio.gather(*renames)
+        await self._refuse_partial(job, relocations)
+        if not relocations:
+            return job
+        await self._set_location(job, {torrent_hash: torrent for torrent_hash, (torrent, _, _) in relocations.items()}, destination_path)
+        if not job.relocating:
+            return job
+        if on_done is None:
+            await self._finish_relocation(job, relocations, destination_path, progress_message)
+            return job
+        job.task = asyncio.create_task(self._finish_in_background(job, relocations, destination_path, progress_message, on_done))
+        self.tasks.add(job.task)
+        job.task.add_done_callback(self.tasks.discard)
+        return job
+
+    async def _finish_relocation(self, job, relocations, destination_path, progress_message):
+        await self._wait_for_relocation(job, progress_message)
+        for torrent_hash, (torrent, save_path, entries) in relocations.items():
+            if torrent_hash not in job.relocating:
+                continue
+            error = job.relocating[torrent_hash]
+            if isinstance(error, Exception):
+                job.failed.append((torrent['name'], error))
+                continue
+            # Relocation keeps the torrent's folder layout below the destination
+            for entry in entries:
+                job.moved.append((os.path.join(save_path, entry.name), os.path.join(destination_path, entry.name)))
+
+    async def _finish_in_background(self, job, relocations, destination_path, progress_message, on_done):
+        try:
+            await self._finish_relocation(job, relocations, destination_path, progress_message)
+        except Exception as e:
+            logger.exception(f"Waiting for qBittorrent to move torrents failed: {e}")
+            job.failed.extend((torrent['name'], e) for torrent, _, _ in relocations.values())
+        try:
+            await on_done(job)
+        except Exception as e:
+            logger.warning(f"Reporting a finished client move failed: {e}")
+
+    async def relocate(self, torrents, destination_path, progress_message=None):
+        # Moves whole torrents (hash -> torrent) and waits until qBittorrent is done
+        job = ClientMoveJob()
+        await self._set_location(job, torrents, destination_path)
+        if job.relocating:
+            await self._wait_for_relocation(job, progress_message)
+        for torrent_hash, result in job.relocating.items():
+            if isinstance(result, Exception):
+                job.failed.append((torrents[torrent_hash]['name'], result))
+            else:
+                job.moved.append((torrents[torrent_hash]['name'], destination_path))
+        return job
+
+    async def _wait_for_relocation(self, job, progress_message):
+        # qBittorrent moves data asynchronously and reports state 'moving' meanwhile
+        deadline = time.monotonic() + self.timeout
+        last_text = None
+        while True:
+            await self.torrent_cache.refresh()
+            pending = []
+            for torrent_hash, destination_path in job.relocating.items():
+                if isinstance(destination_path, Exception):
+                    continue
+                torrent = self.torrent_cache.torrents.get(torrent_hash)
+                if torrent is None:
+                    job.relocating[torrent_hash] = RuntimeError('torrent disappeared while moving')
+                elif torrent.get('state') == 'moving' or _normalize(torrent.get('save_path', '')) != _normalize(destination_path):
+                    pending.append(torrent_hash)
+            if not pending:
+                return
+            if time.monotonic() > deadline:
+                for torrent_hash in pending:
+                    job.relocating[torrent_hash] = TimeoutError('qBittorrent did not finish moving in time')
+                return
+
+            if progress_message is not None:
+                text = job.describe(self.torrent_cache)
+                if text != last_text:
+                    try:
+                        await progress_message.edit_text(text)
+                        last_text = text
+                    except Exception as e:
+                        logger.debug(f"Progress update failed: {e}")
+            await asyncio.sleep(self.poll_interval)
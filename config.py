@@ -7,8 +7,106 @@ TELEGRAM_TOKEN = "YOUR_TELEGRAM_TOKEN"
 # Replace with your actual allowed user IDs
 ALLOWED_USERS = [123456789, 987654321]
 
+# Outgoing Telegram messages per second, across all chats and per chat
+TELEGRAM_GLOBAL_RATE = 30
+TELEGRAM_PER_CHAT_RATE = 1
+
+# Chats told about torrents whose adder is unknown (added by URL or outside the bot)
+NOTIFY_DEFAULT_CHATS = []
+
 # Replace with your actual qBittorrent credentials
 QBITTORRENT_HOST = 'http://localhost:8080'
 QBITTORRENT_USERNAME = 'admin'
 QBITTORRENT_PASSWORD = 'YOUR_NEW_PASSWORD'
+
+# Worker threads (and pooled HTTP connections) used for qBittorrent Web API calls, per node
+QBITTORRENT_MAX_WORKERS = 8
+
+# Several qBittorrent instances (seedbox nodes) instead of the single one above, e.g.
+# QBITTORRENT_NODES = [
+#     {'name': 'box1', 'host': 'http://10.0.0.2:8080', 'username': 'admin', 'password': '...'},
+#     {'name': 'box2', 'host': 'http://10.0.0.3:8080', 'username': 'admin', 'password': '...'},
+# ]
+# Reads query every node in parallel, commands go to the node holding the torrent
+# and new torrents to the node with the most free disk space.
+QBITTORRENT_NODES = []
+# Seconds a reply waits for a node before using that node's cached torrents
+QBITTORRENT_NODE_TIMEOUT = 3
+
+# Seconds between background /sync/maindata refreshes of the torrent cache
+TORRENT_CACHE_REFRESH_INTERVAL = 5
+# Maximum age in seconds of cached torrent data before a command forces a refresh
+TORRENT_CACHE_MAX_STALENESS = 15
+# Maximum number of concurrent torrents_files requests when file lists are not cached
+FILE_FETCH_CONCURRENCY = 8
+
+# Torrents shown per /status page (pages are also cut to fit Telegram's message size)
+STATUS_PAGE_SIZE = 20
+# Files shown per /list page (long paths are shortened so a page fits one message)
+LIST_PAGE_SIZE = 50
+# Seconds between /watch refreshes, and the minimum gap between edits of one chat's dashboard
+WATCH_INTERVAL = 5
+WATCH_MIN_EDIT_INTERVAL = 3
+
+# Worker threads for file moves, and how many may write to one filesystem at once
+MOVE_WORKERS = 4
+MOVE_PER_DEVICE = 2
+# 'filesystem' renames/copies files behind qBittorrent's back; 'client' asks
+# qBittorrent to move them (setLocation/renameFile) so seeding continues without a recheck.
+# In 'client' mode a destination outside the torrent's save path moves the whole torrent.
+MOVE_MODE = 'filesystem'
 #########################################################################
+
+# Post-download rules (see rules.py): where queued rule jobs are kept across
+# restarts, how many run at once and how many may be unfinished at once
+# (rules for further completions are skipped)
+PIPELINE_STATE_FILE = 'pipeline_jobs.json'
+RULE_WORKERS = 2
+RULE_QUEUE_SIZE = 100
+
+# Conversation state and user_data survive restarts in PERSISTENCE_FILE; the
+# torrent cache and notification bookkeeping are snapshotted to SNAPSHOT_FILE.
+# Changes are written in batches at most every PERSISTENCE_INTERVAL seconds.
+PERSISTENCE_FILE = 'bot_state.pickle'
+SNAPSHOT_FILE = 'cache_snapshot.pickle'
+PERSISTENCE_INTERVAL = 30
+
+# 'polling' (getUpdates) or 'webhook'. In webhook mode the bot serves HTTP on
+# WEBHOOK_LISTEN:WEBHOOK_PORT, or on WEBHOOK_UNIX_SOCKET behind a reverse proxy,
+# and registers WEBHOOK_URL (the public https URL ending in WEBHOOK_PATH) with Telegram.
+# Requests must carry WEBHOOK_SECRET_TOKEN; leave it empty for a random one per start.
+BOT_MODE = 'polling'
+WEBHOOK_URL = ''
+WEBHOOK_LISTEN = '127.0.0.1'
+WEBHOOK_PORT = 8443
+WEBHOOK_PATH = 'telegram'
+WEBHOOK_SECRET_TOKEN = ''
+WEBHOOK_UNIX_SOCKET = None
+# Updates handled at once; messages from one chat are still handled in order
+MAX_CONCURRENT_UPDATES = 64
+
+# Commands one user may have running at once (more are turned away), and how
+# many runs of a heavy command are allowed across all users (more wait their turn)
+USER_CONCURRENCY = 2
+COMMAND_CONCURRENCY = {'move': 2, 'move_specific': 2, 'list': 4, 'add': 4, 'remove': 2, 'pause': 4, 'resume': 4}
+
+# Prometheus metrics on http://METRICS_HOST:METRICS_PORT/metrics (None disables the endpoint)
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = 9877
+# Users allowed to run /stats; empty means every allowed user
+ADMIN_USERS = []
+
+# Download scheduler: at most DOWNLOAD_SLOTS scheduled downloads run at once
+# (0 hands every torrent straight to qBittorrent). New torrents wait until a
+# slot is free and the node keeps DISK_RESERVE bytes free after they finish.
+# A download stalled for STALL_TIMEOUT seconds yields its slot to the queue.
+DOWNLOAD_SLOTS = 0
+DISK_RESERVE = 10 * 1024**3
+SCHEDULER_INTERVAL = 10
+STALL_TIMEOUT = 600
+
+# /search: torrents listed per reply, and how the index picks up file lists of
+# torrents it has not seen yet (torrents per batch, seconds between crawls)
+SEARCH_RESULTS = 20
+SEARCH_CRAWL_BATCH = 50
+SEARCH_CRAWL_INTERVAL = 60
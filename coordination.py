@@ -0,0 +1,93 @@
+import asyncio
+import contextlib
+import functools
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# One asyncio.Lock per key (file path, torrent hash...), created on demand and
+# dropped again once nobody holds or waits for it.
+class KeyedLocks:
+    def __init__(self):
+        self.locks = {}
+        self.users = {}
+
+    @contextlib.asynccontextmanager
+    async def hold(self, *keys):
+        # Several keys are always taken in sorted order so two holders cannot deadlock
+        keys = sorted(set(keys))
+        for key in keys:
+            self.users[key] = self.users.get(key, 0) + 1
+            if key not in self.locks:
+                self.locks[key] = asyncio.Lock()
+        acquired = []
+        try:
+            for key in keys:
+                await self.locks[key].acquire()
+                acquired.append(key)
+            yield
+        finally:
+            for key in acquired:
+                self.locks[key].release()
+            for key in keys:
+                self.users[key] -= 1
+                if not self.users[key]:
+                    del self.users[key]
+                    del self.locks[key]
+
+
+# Concurrent calls with the same key share the result of the first one
+# instead of each hitting the backend.
+class SingleFlight:
+    def __init__(self):
+        self.in_flight = {}
+
+    async def run(self, key, factory):
+        future = self.in_flight.get(key)
+        if future is None:
+            future = self.in_flight[key] = asyncio.ensure_future(factory())
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        # A caller giving up must not cancel the call for the others
+        return await asyncio.shield(future)
+
+
+# Caps how many commands one user can have running (further ones are turned
+# away through `on_reject`) and how many instances of a command run at once
+# across all users (further ones wait for a slot).
+class CommandLimiter:
+    def __init__(self, per_user=2, per_command=None, on_reject=None):
+        self.per_user = per_user
+        self.per_command = dict(per_command or {})
+        self.on_reject = on_reject
+        self.running = {}
+        self.command_slots = {}
+
+    def _slot(self, command):
+        limit = self.per_command.get(command)
+        if limit is None:
+            return contextlib.nullcontext()
+        slot = self.command_slots.get(command)
+        if slot is None:
+            slot = self.command_slots[command] = asyncio.Semaphore(limit)
+        return slot
+
+    def limit(self, command):
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapped(update, context, *args, **kwargs):
+                user_id = update.effective_user.id
+                if self.running.get(user_id, 0) >= self.per_user:
+                    if self.on_reject is not None:
+                        await self.on_reject(update, command)
+                    return
+                self.running[user_id] = self.running.get(user_id, 0) + 1
+                try:
+                    async with self._slot(command):
+                        return await func(update, context, *args, **kwargs)
+                finally:
+                    self.running[user_id] -= 1
+                    if not self.running[user_id]:
+                        del self.running[user_id]
+            return wrapped
+        return decorator
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+
+from file_index import FileIndex
+from metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Torrent fields whose change means the file list (or its progress) is outdated
+INVALIDATING_FIELDS = ('progress', 'completion_on', 'save_path', 'content_path')
+# Fields whose change means file paths may have changed, not just progress
+PATH_FIELDS = ('content_path',)
+
+
+# Per-torrent file lists keyed by hash. Entries are dropped when the torrent
+# cache reports a progress/completion change, and misses are fetched
+# concurrently with at most `concurrency` torrents_files requests in flight.
+# Every cached list is also kept in a FileIndex for pattern lookups.
+class FileListCache:
+    def __init__(self, aqb, concurrency=8):
+        self.aqb = aqb
+        self.files = {}
+        self.index = FileIndex()
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.listeners = []
+
+    def add_listener(self, callback):
+        # callback(torrent_hash, files) runs whenever a file list is fetched, and
+        # with files=None when a list is dropped because its paths may have changed
+        self.listeners.append(callback)
+
+    def _notify(self, torrent_hash, files):
+        for callback in self.listeners:
+            try:
+                callback(torrent_hash, files)
+            except Exception as e:
+                logger.exception(f"File cache listener failed: {e}")
+
+    def on_torrents_changed(self, changed, removed):
+        for torrent_hash, changes in changed.items():
+            if any(field in changes for field in INVALIDATING_FIELDS):
+                self.invalidate(torrent_hash, paths_changed=any(field in changes for field in PATH_FIELDS))
+        for torrent_hash in removed:
+            self.invalidate(torrent_hash, paths_changed=False)
+
+    def invalidate(self, torrent_hash, paths_changed=True):
+        # Callers that renamed or moved files leave paths_changed set
+        if self.files.pop(torrent_hash, None) is not None:
+            self.index.remove_torrent(torrent_hash)
+        if paths_changed:
+            self._notify(torrent_hash, None)
+
+    async def _fetch(self, torrent_hash):
+        async with self.semaphore:
+            files = await self.aqb.torrents_files(torrent_hash=torrent_hash)
+        files = [dict(file) for file in files]
+        self.files[torrent_hash] = files
+        self.index.add_torrent(torrent_hash, files)
+        self._notify(torrent_hash, files)
+        return files
+
+    async def get(self, torrent_hash):
+        files = self.files.get(torrent_hash)
+        CACHE_REQUESTS.inc(cache='files', result='hit' if files is not None else 'miss')
+        if files is None:
+            files = await self._fetch(torrent_hash)
+        return files
+
+    async def get_many(self, torrent_hashes):
+        missing = [torrent_hash for torrent_hash in torrent_hashes if torrent_hash not in self.files]
+        CACHE_REQUESTS.inc(len(torrent_hashes) - len(missing), cache='files', result='hit')
+        CACHE_REQUESTS.inc(len(missing), cache='files', result='miss')
+        if missing:
+            results = await asyncio.gather(*(self._fetch(torrent_hash) for torrent_hash in missing), return_exceptions=True)
+            for torrent_hash, result in zip(missing, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"Failed to fetch files of torrent {torrent_hash}: {result}")
+        return {torrent_hash: self.files[torrent_hash] for torrent_hash in torrent_hashes if torrent_hash in self.files}
+
+    async def match(self, pattern, torrent_hashes):
+        # Loads any missing file lists, then answers from the index
+        await self.get_many(torrent_hashes)
+        return self.index.match(pattern, torrent_hashes)
@@ -0,0 +1,72 @@
+from collections import namedtuple
+from fnmatch import translate
+from functools import lru_cache
+import posixpath
+import re
+
+FileEntry = namedtuple('FileEntry', ['torrent_hash', 'name', 'dirname', 'basename', 'ext'])
+
+# `*.mkv`, `*.tar.gz`: answered from the extension bucket without a regex scan
+EXTENSION_PATTERN = re.compile(r'^\*\.([^*?\[\]/]+)$')
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern):
+    return re.compile(translate(pattern)).match
+
+
+def split_ext(basename):
+    _, dot, ext = basename.rpartition('.')
+    return ext if dot else ''
+
+
+# Index over every known torrent file path with the directory, basename and
+# extension pre-split, bucketed by torrent and by extension.
+class FileIndex:
+    def __init__(self):
+        self.by_torrent = {}
+        self.by_ext = {}
+
+    def add_torrent(self, torrent_hash, files):
+        self.remove_torrent(torrent_hash)
+        entries = []
+        for file in files:
+            name = file['name']
+            dirname, basename = posixpath.split(name)
+            entry = FileEntry(torrent_hash, name, dirname, basename, split_ext(basename))
+            entries.append(entry)
+            self.by_ext.setdefault(entry.ext, {}).setdefault(torrent_hash, []).append(entry)
+        self.by_torrent[torrent_hash] = entries
+
+    def remove_torrent(self, torrent_hash):
+        entries = self.by_torrent.pop(torrent_hash, None)
+        if not entries:
+            return
+        for ext in {entry.ext for entry in entries}:
+            bucket = self.by_ext.get(ext)
+            if bucket is not None:
+                bucket.pop(torrent_hash, None)
+                if not bucket:
+                    del self.by_ext[ext]
+
+    def match(self, pattern, torrent_hashes=None):
+        # Same semantics as fnmatch.fnmatchcase(file['name'], pattern)
+        torrent_hashes = self.by_torrent.keys() if torrent_hashes is None else set(torrent_hashes)
+
+        extension = EXTENSION_PATTERN.match(pattern)
+        if extension:
+            suffix = '.' + extension.group(1)
+            bucket = self.by_ext.get(split_ext(suffix), {})
+            if len(bucket) < len(torrent_hashes):
+                candidates = (bucket[torrent_hash] for torrent_hash in bucket if torrent_hash in torrent_hashes)
+            else:
+                candidates = (bucket[torrent_hash] for torrent_hash in torrent_hashes if torrent_hash in bucket)
+            return [entry for entries in candidates for entry in entries if entry.name.endswith(suffix)]
+
+        matcher = compile_pattern(pattern)
+        return [
+            entry
+            for torrent_hash in torrent_hashes
+            for entry in self.by_torrent.get(torrent_hash, ())
+            if matcher(entry.name)
+        ]
@@ -0,0 +1,114 @@
+import gzip
+import io
+import re
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from mover import format_size
+from send_queue import MAX_MESSAGE_LENGTH
+
+# /list <torrent> <mode>: 'all' streams every file as messages, 'tsv' and 'tree' send a gzip attachment
+LIST_MODES = ('all', 'tsv', 'tree')
+EXPORT_EXTENSIONS = {'tsv': 'tsv.gz', 'tree': 'txt.gz'}
+# Shortest line a /list page cuts a path to; fewer files go on a page instead
+MIN_LINE_WIDTH = 24
+# Room for the page header, which carries up to 100 characters of the torrent name
+HEADER_BUDGET = 200
+
+
+def file_line(file, width=None):
+    line = f"{file['name']} ({format_size(file.get('size', 0))}, {file.get('progress', 0):.0%})"
+    if width is not None and len(line) > width:
+        # Keep the end of the path, where the file name is
+        line = '…' + line[-(width - 1):]
+    return line
+
+
+def iter_chunks(files, header='', limit=MAX_MESSAGE_LENGTH):
+    # Yields message-sized texts one at a time, so a huge file list is never
+    # rendered as a whole
+    chunk = [header] if header else []
+    size = len(header)
+    for file in files:
+        line = file_line(file, limit)
+        if chunk and size + len(line) + 1 > limit:
+            yield '\n'.join(chunk)
+            chunk, size = [], 0
+        chunk.append(line)
+        size += len(line) + 1
+    if chunk:
+        yield '\n'.join(chunk)
+
+
+def _clean(text):
+    return text.replace('\t', ' ').replace('\n', ' ')
+
+
+def _tsv_lines(files):
+    yield 'path\tsize\tprogress\n'
+    for file in files:
+        yield f"{_clean(file['name'])}\t{file.get('size', 0)}\t{file.get('progress', 0):.4f}\n"
+
+
+def _tree_lines(files):
+    # Directories are written once, followed by their files indented below them
+    previous = []
+    for file in sorted(files, key=lambda file: file['name'].split('/')):
+        parts = _clean(file['name']).split('/')
+        directories = parts[:-1]
+        common = 0
+        while common < min(len(previous), len(directories)) and previous[common] == directories[common]:
+            common += 1
+        for depth in range(common, len(directories)):
+            yield f"{'  ' * depth}{directories[depth]}/\n"
+        yield f"{'  ' * len(directories)}{parts[-1]}  {format_size(file.get('size', 0))}  {file.get('progress', 0):.0%}\n"
+        previous = directories
+
+
+def export_files(files, mode='tsv'):
+    # Returns the gzip-compressed listing, written line by line into memory
+    lines = _tsv_lines(files) if mode == 'tsv' else _tree_lines(files)
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as compressed:
+        with io.TextIOWrapper(compressed, encoding='utf-8', newline='\n') as text:
+            text.writelines(lines)
+    return buffer.getvalue()
+
+
+def export_filename(name, mode='tsv'):
+    stem = re.sub(r'[^\w.-]+', '_', name).strip('_')[:60] or 'files'
+    return f"{stem}.{EXPORT_EXTENSIONS[mode]}"
+
+
+# /list pages for one torrent. A page is a slice of qBittorrent's file order
+# with lines shortened so `page_size` of them always fit one message (a page
+# size that would cut lines below MIN_LINE_WIDTH is lowered), so a page of a
+# torrent with 100k files costs no more than one of a small torrent.
+class FileListView:
+    def __init__(self, page_size=50):
+        self.page_size = page_size
+
+    def render(self, torrent_hash, name, files, page=0):
+        # Returns (text, reply_markup)
+        page_size = max(1, min(self.page_size, (MAX_MESSAGE_LENGTH - HEADER_BUDGET) // (MIN_LINE_WIDTH + 1)))
+        page_count = max(1, -(-len(files) // page_size))
+        page = max(0, min(page, page_count - 1))
+        header = f"Files in torrent '{name[:100]}', {len(files)} files, page {page + 1}/{page_count}:\n\n"
+        width = max(MIN_LINE_WIDTH, (MAX_MESSAGE_LENGTH - len(header)) // page_size - 1)
+        start = page * page_size
+        lines = [file_line(file, width) for file in files[start:start + page_size]]
+        text = header + '\n'.join(lines)
+        return text[:MAX_MESSAGE_LENGTH], self.keyboard(torrent_hash, page, page_count)
+
+    @staticmethod
+    def keyboard(torrent_hash, page, page_count):
+        if page_count <= 1:
+            return None
+        nav_row = []
+        if page > 0:
+            nav_row.append(InlineKeyboardButton('« First', callback_data=f"files:{torrent_hash}:0"))
+            nav_row.append(InlineKeyboardButton('‹ Prev', callback_data=f"files:{torrent_hash}:{page - 1}"))
+        if page < page_count - 1:
+            nav_row.append(InlineKeyboardButton('Next ›', callback_data=f"files:{torrent_hash}:{page + 1}"))
+            nav_row.append(InlineKeyboardButton('Last »', callback_data=f"files:{torrent_hash}:{page_count - 1}"))
+        return InlineKeyboardMarkup([nav_row])
@@ -1,11 +1,41 @@
 #!/usr/bin/env python3
 
-import os
 import logging
 from telegram import Update
-from telegram.ext import Application, CommandHandler, CallbackContext
+from telegram.error import BadRequest
+from telegram.ext import Application, CommandHandler, CallbackContext, CallbackQueryHandler, MessageHandler, filters
 import qbittorrentapi
-from config import TELEGRAM_TOKEN, ALLOWED_USERS, QBITTORRENT_HOST, QBITTORRENT_USERNAME, QBITTORRENT_PASSWORD
+from config import TELEGRAM_TOKEN, ALLOWED_USERS, QBITTORRENT_HOST, QBITTORRENT_USERNAME, QBITTORRENT_PASSWORD, QBITTORRENT_MAX_WORKERS
+from config import QBITTORRENT_NODES, QBITTORRENT_NODE_TIMEOUT
+from config import TORRENT_CACHE_REFRESH_INTERVAL, TORRENT_CACHE_MAX_STALENESS, FILE_FETCH_CONCURRENCY
+from config import TELEGRAM_GLOBAL_RATE, TELEGRAM_PER_CHAT_RATE, NOTIFY_DEFAULT_CHATS
+from config import STATUS_PAGE_SIZE, WATCH_INTERVAL, WATCH_MIN_EDIT_INTERVAL
+from config import BOT_MODE, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET_TOKEN, WEBHOOK_UNIX_SOCKET, MAX_CONCURRENT_UPDATES
+from config import METRICS_HOST, METRICS_PORT, ADMIN_USERS
+from config import USER_CONCURRENCY, COMMAND_CONCURRENCY
+from config import DOWNLOAD_SLOTS, DISK_RESERVE, SCHEDULER_INTERVAL, STALL_TIMEOUT
+from config import SEARCH_RESULTS, SEARCH_CRAWL_BATCH, SEARCH_CRAWL_INTERVAL
+from config import SNAPSHOT_FILE, PERSISTENCE_INTERVAL
+from config import PIPELINE_STATE_FILE, RULE_WORKERS, RULE_QUEUE_SIZE
+from config import MOVE_WORKERS, MOVE_PER_DEVICE
+from node_pool import PooledQBittorrent, PooledTorrentCache, create_nodes
+from file_cache import FileListCache
+from torrent_filters import is_exact_selection, select_torrents
+from mover import MoveEngine
+from status_view import StatusView, STATUS_FILTERS
+from watch import WatchManager
+from send_queue import SendQueue
+from torrent_uploads import UploadBatcher, magnet_info_hash
+from notifier import Notifier
+from pipeline import Pipeline
+from scheduler import DownloadScheduler
+from search_index import SearchIndex, SearchIndexer
+from snapshot import SnapshotStore
+from coordination import CommandLimiter
+from metrics import REGISTRY, HANDLER_LATENCY, MetricsServer, format_stats
+from updates import ChatOrderedUpdateProcessor, run
+from rules import RULES
+from client_move import ClientMover
 
 # Enable logging
 logging.basicConfig(
@@ -14,24 +44,86 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize qBittorrent client
-qb = qbittorrentapi.Client(host=QBITTORRENT_HOST, username=QBITTORRENT_USERNAME, password=QBITTORRENT_PASSWORD)
+# One session per qBittorrent node; each logs in lazily, re-authenticates on 403
+# and stops calling its node for a while when it is down. Every node keeps its
+# own torrent table, refreshed in the background from /sync/maindata deltas.
+nodes = create_nodes(
+    QBITTORRENT_NODES or [{'name': 'qbittorrent', 'host': QBITTORRENT_HOST, 'username': QBITTORRENT_USERNAME, 'password': QBITTORRENT_PASSWORD}],
+    max_workers=QBITTORRENT_MAX_WORKERS,
+    refresh_interval=TORRENT_CACHE_REFRESH_INTERVAL,
+    max_staleness=TORRENT_CACHE_MAX_STALENESS,
+)
+# All nodes' torrents merged into one table, refreshed in parallel
+torrent_cache = PooledTorrentCache(nodes, timeout=QBITTORRENT_NODE_TIMEOUT)
+# Handlers await this wrapper so Web API round-trips never block the event loop;
+# calls are routed to the node that owns the torrent
+aqb = PooledQBittorrent(torrent_cache)
+# Every reply goes through this rate-limited, coalescing queue
+send_queue = SendQueue(global_rate=TELEGRAM_GLOBAL_RATE, per_chat_rate=TELEGRAM_PER_CHAT_RATE)
+REGISTRY.gauge('telbot_send_queue_depth', 'Outgoing Telegram messages and edits waiting to be sent', send_queue.depth)
+# Completion/error/stall notifications for the chat that added each torrent
+notifier = Notifier(send_queue, torrent_cache, default_chats=NOTIFY_DEFAULT_CHATS)
+torrent_cache.add_listener(notifier.on_torrents_changed)
+# New downloads wait here until a slot and enough disk space are free
+scheduler = DownloadScheduler(aqb, torrent_cache, slots=DOWNLOAD_SLOTS, reserve=DISK_RESERVE, interval=SCHEDULER_INTERVAL, stall_timeout=STALL_TIMEOUT)
+torrent_cache.add_listener(scheduler.on_torrents_changed)
+
+def torrents_added(chat_id, torrent_hashes, priority=0):
+    notifier.record(chat_id, torrent_hashes)
+    scheduler.submit(chat_id, torrent_hashes, priority)
 
-try:
-    qb.auth_log_in()
-except qbittorrentapi.LoginFailed as e:
-    logger.error(f"Failed to log in to qBittorrent: {e}")
+# .torrent documents sent in a burst are added together in one call
+upload_batcher = UploadBatcher(aqb, torrent_cache, send_queue, on_added=torrents_added, add_options=scheduler.add_options(magnet=False))
+# /status pages with per-torrent rendered lines cached between calls
+status_view = StatusView(page_size=STATUS_PAGE_SIZE)
+torrent_cache.add_listener(status_view.on_torrents_changed)
+# Live /watch dashboards, refreshed together from one torrent cache read
+watch_manager = WatchManager(send_queue, torrent_cache, status_view, interval=WATCH_INTERVAL, min_edit_interval=WATCH_MIN_EDIT_INTERVAL)
+# File moves run on worker threads with a cross-device copy fallback
+move_engine = MoveEngine(max_workers=MOVE_WORKERS, per_device=MOVE_PER_DEVICE)
+# File lists and qBittorrent-side moves used by the post-download rules
+file_cache = FileListCache(aqb, concurrency=FILE_FETCH_CONCURRENCY)
+torrent_cache.add_listener(file_cache.on_torrents_changed)
+client_mover = ClientMover(aqb, torrent_cache, file_cache)
+# Post-download rules from rules.py, run from a persistent job queue
+pipeline = Pipeline(aqb, torrent_cache, file_cache, client_mover, RULES, PIPELINE_STATE_FILE, workers=RULE_WORKERS, queue_size=RULE_QUEUE_SIZE)
+notifier.subscribe(pipeline.on_event)
+torrent_cache.add_listener(pipeline.on_torrents_changed)
+# /search over torrent names and file paths, kept current from both caches
+search_index = SearchIndex()
+torrent_cache.add_listener(search_index.on_torrents_changed)
+file_cache.add_listener(search_index.on_files_fetched)
+search_indexer = SearchIndexer(search_index, torrent_cache, file_cache, batch_size=SEARCH_CRAWL_BATCH, interval=SEARCH_CRAWL_INTERVAL)
+# Notifier bookkeeping and the torrent table are snapshotted so restarts start warm
+snapshot_store = SnapshotStore(SNAPSHOT_FILE, interval=PERSISTENCE_INTERVAL)
+snapshot_store.register('notifier', notifier.snapshot, notifier.restore)
+snapshot_store.register('torrents', torrent_cache.snapshot, torrent_cache.restore)
+snapshot_store.register('scheduler', scheduler.snapshot, scheduler.restore)
+snapshot_store.register('search', search_index.snapshot, search_index.restore)
+file_cache.add_listener(lambda torrent_hash, files: snapshot_store.mark_dirty())
+torrent_cache.add_listener(lambda changed, removed: snapshot_store.mark_dirty() if changed or removed else None)
+notifier.on_record = snapshot_store.mark_dirty
+scheduler.on_change = snapshot_store.mark_dirty
+# Local /metrics endpoint; /stats shows the same numbers in the chat
+metrics_server = MetricsServer(REGISTRY, host=METRICS_HOST, port=METRICS_PORT)
 
 # Security decorator
 def restricted(func):
     async def wrapped(update: Update, context: CallbackContext, *args, **kwargs):
         user_id = update.effective_user.id
         if user_id not in ALLOWED_USERS:
-            await update.message.reply_text("You are not authorized to use this bot.")
+            await send_queue.reply(update, "You are not authorized to use this bot.")
             return
-        return await func(update, context, *args, **kwargs)
+        with HANDLER_LATENCY.time(handler=func.__name__):
+            return await func(update, context, *args, **kwargs)
     return wrapped
 
+async def reject_busy(update: Update, command: str) -> None:
+    await send_queue.reply(update, f"You already have {USER_CONCURRENCY} commands running, send /{command} again once one has finished.")
+
+# Per-user and per-command concurrency limits for the commands that do real work
+command_limiter = CommandLimiter(per_user=USER_CONCURRENCY, per_command=COMMAND_CONCURRENCY, on_reject=reject_busy)
+
 # Define the commands
 @restricted
 async def start(update: Update, context: CallbackContext) -> None:
@@ -39,91 +131,291 @@ async def start(update: Update, context: CallbackContext) -> None:
         "Welcome to the Telegram Torrent Bot!\n\n"
         "Here are the available commands:\n"
         "/start - Display this message\n"
-        "/add <magnet_link> - Add a torrent\n"
+        "/add <magnet_link> [<magnet_link> ...] [priority=<n>] - Add one or more torrents (or send .torrent files)\n"
         "/move <source_path> <destination_path> - Move a file\n"
-        "/status - Show the status of active torrents\n"
-        "/remove <torrent_name_or_hash> - Remove a torrent\n"
+        "/status [all|downloading|seeding|stalled|errored] - Show the status of torrents\n"
+        "/watch [filter] - Keep a live status message in this chat (/unwatch to stop)\n"
+        "/remove <torrent_name_or_hash|filter> - Remove torrents (name prefix, 8+ hash characters, or e.g. state=seeding ratio>=2 age>30d; anything but an exact name or full hash needs 'confirm')\n"
+        "/pause <torrent_name_or_hash|filter> - Pause torrents\n"
+        "/resume <torrent_name_or_hash|filter> - Resume torrents\n"
+        "/search <words> - Find torrents by name or file path (typos allowed)\n"
+        "/stats - Show bot latency and cache statistics\n"
     )
-    await update.message.reply_text(motd)
+    await send_queue.reply(update, motd)
 
 @restricted
+@command_limiter.limit('add')
 async def add_torrent(update: Update, context: CallbackContext) -> None:
-    magnet_link = ' '.join(context.args)
-    if not magnet_link:
-        await update.message.reply_text('Please provide a magnet link or torrent URL.')
+    # Every argument is one magnet link or URL, all sent in a single torrents_add call;
+    # priority=<n> puts them ahead of (or behind) this chat's other queued downloads
+    urls = [arg for arg in context.args if not arg.startswith('priority=')]
+    priorities = [arg.split('=', 1)[1] for arg in context.args if arg.startswith('priority=')]
+    if not urls or not all(priority.lstrip('-').isdigit() for priority in priorities):
+        await send_queue.reply(update, 'Please provide one or more magnet links or torrent URLs, optionally with priority=<number>.')
         return
+    priority = int(priorities[-1]) if priorities else 0
 
     try:
-        qb.torrents_add(urls=magnet_link)
-        await update.message.reply_text('Torrent added successfully!')
+        # Skip magnets whose info-hash the client already has
+        await torrent_cache.ensure_fresh()
+        duplicates = [url for url in urls if magnet_info_hash(url) in torrent_cache.torrents]
+        urls = [url for url in urls if url not in duplicates]
+        if not urls:
+            await send_queue.reply(update, 'This torrent was already added.' if len(duplicates) == 1 else 'These torrents were already added.')
+            return
+
+        # .torrent URLs have no hash yet, the scheduler picks them up by tag once qBittorrent fetched them
+        magnets = [url for url in urls if magnet_info_hash(url)]
+        links = [url for url in urls if not magnet_info_hash(url)]
+        if magnets:
+            result = await aqb.torrents_add(urls=magnets, **scheduler.add_options(magnet=True))
+            if result == 'Fails.':
+                await send_queue.reply(update, 'qBittorrent refused to add the torrent(s).')
+                return
+            torrents_added(update.effective_chat.id, [magnet_info_hash(url) for url in magnets], priority)
+        if links:
+            url_options = scheduler.url_options()
+            result = await aqb.torrents_add(urls=links, **url_options)
+            if result == 'Fails.':
+                await send_queue.reply(update, 'qBittorrent refused to add the torrent(s).')
+                return
+            scheduler.submit_urls(update.effective_chat.id, url_options, len(links), priority)
+        message = 'Torrent added successfully!' if len(urls) == 1 else f'{len(urls)} torrents added successfully!'
+        if scheduler.enabled:
+            message += ' Downloads start once a slot and enough disk space are free.'
+        if duplicates:
+            message += f' ({len(duplicates)} already added)'
+        await send_queue.reply(update, message)
     except qbittorrentapi.APIConnectionError:
-        await update.message.reply_text('Failed to connect to qBittorrent. Ensure it is running.')
+        await send_queue.reply(update, 'Failed to connect to qBittorrent. Ensure it is running.')
     except Exception as e:
-        await update.message.reply_text(f'An error occurred: {e}')
+        await send_queue.reply(update, f'An error occurred: {e}')
 
 @restricted
+@command_limiter.limit('add')
+async def add_torrent_file(update: Update, context: CallbackContext) -> None:
+    try:
+        await upload_batcher.add(update, update.message.document)
+    except Exception as e:
+        await send_queue.reply(update, f'An error occurred: {e}')
+
+@restricted
+@command_limiter.limit('move')
 async def move_file(update: Update, context: CallbackContext) -> None:
     args = context.args
     if len(args) != 2:
-        await update.message.reply_text('Usage: /move <source_path> <destination_path>')
+        await send_queue.reply(update, 'Usage: /move <source_path> <destination_path>')
         return
 
     source_path, destination_path = args
     try:
-        os.rename(source_path, destination_path)
-        await update.message.reply_text(f'File moved from {source_path} to {destination_path}')
+        job = await move_engine.move_many([(source_path, destination_path)])
+        if job.failed:
+            raise job.failed[0][1]
+        await send_queue.reply(update, f'File moved from {source_path} to {destination_path}')
     except Exception as e:
-        await update.message.reply_text(f'Error: {e}')
+        await send_queue.reply(update, f'Error: {e}')
 
 @restricted
 async def status(update: Update, context: CallbackContext) -> None:
+    status_filter = context.args[0] if context.args else 'all'
+    if status_filter not in STATUS_FILTERS:
+        await send_queue.reply(update, f"Usage: /status [{'|'.join(STATUS_FILTERS)}]")
+        return
+
     try:
-        torrents = qb.torrents_info()
-        if not torrents:
-            await update.message.reply_text('No active torrents.')
-            return
-        
-        status_message = ""
-        for torrent in torrents:
-            status_message += f"Name: {torrent['name']}\nProgress: {torrent['progress']*100:.2f}%\nState: {torrent['state']}\n\n"
-        
-        await update.message.reply_text(status_message)
+        torrents = await torrent_cache.get_torrents()
+        text, reply_markup = status_view.render(torrents, status_filter)
+        await send_queue.reply(update, text, reply_markup=reply_markup)
     except Exception as e:
-        await update.message.reply_text(f'An error occurred: {e}')
+        await send_queue.reply(update, f'An error occurred: {e}')
 
 @restricted
-async def remove_torrent(update: Update, context: CallbackContext) -> None:
-    torrent_name_or_hash = ' '.join(context.args)
-    if not torrent_name_or_hash:
-        await update.message.reply_text('Please provide the name or hash of the torrent to remove.')
+async def status_page(update: Update, context: CallbackContext) -> None:
+    # Inline keyboard callbacks carry "status:<filter>:<page>"
+    query = update.callback_query
+    await query.answer()
+    parts = query.data.split(':')
+    if len(parts) != 3 or parts[1] not in STATUS_FILTERS or not parts[2].isdigit():
+        await send_queue.send(update.effective_chat.id, 'This button is no longer valid, please send /status again.')
+        return
+    _, status_filter, page = parts
+    try:
+        torrents = await torrent_cache.get_torrents()
+        text, reply_markup = status_view.render(torrents, status_filter, int(page))
+        await send_queue.edit(query.message.chat_id, query.message.message_id, text, reply_markup=reply_markup)
+    except BadRequest as e:
+        # Refreshing a page whose content did not change
+        if 'not modified' not in str(e):
+            await send_queue.send(update.effective_chat.id, f'An error occurred: {e}')
+    except Exception as e:
+        await send_queue.send(update.effective_chat.id, f'An error occurred: {e}')
+
+@restricted
+async def watch(update: Update, context: CallbackContext) -> None:
+    status_filter = context.args[0] if context.args else 'all'
+    if status_filter not in STATUS_FILTERS:
+        await send_queue.reply(update, f"Usage: /watch [{'|'.join(STATUS_FILTERS)}]")
         return
 
     try:
-        torrents = qb.torrents_info()
-        for torrent in torrents:
-            if torrent_name_or_hash in (torrent['name'], torrent['hash']):
-                qb.torrents_delete(delete_files=True, torrent_hashes=torrent['hash'])
-                await update.message.reply_text(f"Torrent '{torrent['name']}' removed successfully.")
-                return
-        await update.message.reply_text('Torrent not found.')
+        torrents = await torrent_cache.get_torrents()
+        text, _ = status_view.render(torrents, status_filter)
+        message = await send_queue.reply(update, text, coalesce=False)
+        # Replaces any earlier dashboard in this chat
+        watch_manager.watch(update.effective_chat.id, message.message_id, status_filter)
+    except Exception as e:
+        await send_queue.reply(update, f'An error occurred: {e}')
+
+@restricted
+async def unwatch(update: Update, context: CallbackContext) -> None:
+    if watch_manager.unwatch(update.effective_chat.id):
+        await send_queue.reply(update, 'Stopped watching torrents.')
+    else:
+        await send_queue.reply(update, 'No live status in this chat.')
+
+def format_torrent_summary(verb, torrents, limit=20, done=True):
+    names = [torrent['name'] for torrent in torrents[:limit]]
+    if len(torrents) > limit:
+        names.append(f"...and {len(torrents) - limit} more")
+    if len(torrents) == 1:
+        return f"Torrent '{torrents[0]['name']}' {verb} successfully." if done else f"Torrent '{torrents[0]['name']}' {verb}."
+    return f"{len(torrents)} torrents {verb}:\n" + "\n".join(names)
+
+async def apply_to_torrents(update, context, verb, action, confirm=False):
+    # Resolves a name/hash or filter expression against one snapshot, then
+    # issues a single API call with every matching hash pipe-joined. With
+    # confirm=True the action only runs right away for an exact name or full
+    # hash; anything else (prefix, filter) lists the matches and needs the
+    # command repeated with 'confirm' at the end.
+    args = list(context.args)
+    confirmed = bool(args) and args[-1].lower() == 'confirm'
+    if confirmed:
+        args.pop()
+    if not args:
+        await send_queue.reply(update, 'Please provide a torrent name or hash, or a filter such as state=seeding ratio>=2 age>30d category=tv.')
+        return
+
+    try:
+        torrents, error = await select_torrents(torrent_cache, args)
+        if error:
+            await send_queue.reply(update, error)
+            return
+        if not torrents:
+            await send_queue.reply(update, 'Torrent not found.')
+            return
+
+        if confirm and not confirmed and not is_exact_selection(args, torrents):
+            summary = format_torrent_summary(f'would be {verb}', torrents, done=False)
+            await send_queue.reply(update, f"{summary}\n\nRepeat the command with 'confirm' at the end to go ahead.")
+            return
+
+        torrent_hashes = '|'.join(torrent['hash'] for torrent in torrents)
+        await action(torrent_hashes)
+        await send_queue.reply(update, format_torrent_summary(verb, torrents))
     except qbittorrentapi.APIConnectionError:
-        await update.message.reply_text('Failed to connect to qBittorrent. Ensure it is running.')
+        await send_queue.reply(update, 'Failed to connect to qBittorrent. Ensure it is running.')
     except Exception as e:
-        await update.message.reply_text(f'An error occurred: {e}')
+        await send_queue.reply(update, f'An error occurred: {e}')
+
+@restricted
+@command_limiter.limit('remove')
+async def remove_torrent(update: Update, context: CallbackContext) -> None:
+    async def delete(torrent_hashes):
+        await aqb.torrents_delete(delete_files=True, torrent_hashes=torrent_hashes)
+        torrent_cache.discard(torrent_hashes.split('|'))
+    await apply_to_torrents(update, context, 'removed', delete, confirm=True)
+
+@restricted
+async def search(update: Update, context: CallbackContext) -> None:
+    query = ' '.join(context.args)
+    if not query:
+        await send_queue.reply(update, 'Usage: /search <words from a torrent name or file path>')
+        return
+
+    results = search_index.search(query, limit=SEARCH_RESULTS)
+    if not results:
+        note = ' yet, the search index is still loading' if search_index.loading else ''
+        await send_queue.reply(update, f"Nothing matches '{query}'{note}.")
+        return
+
+    lines = []
+    for torrent_hash, _, paths in results:
+        # The hash prefix can be passed to /list, /remove, /pause and /resume
+        lines.append(f"{search_index.names.get(torrent_hash, torrent_hash)} [{torrent_hash[:8]}]")
+        lines.extend(f"  {path}" for path in paths[:5])
+        if len(paths) > 5:
+            lines.append(f"  ...and {len(paths) - 5} more files")
+    await send_queue.reply(update, "\n".join(lines))
+
+@restricted
+async def stats(update: Update, context: CallbackContext) -> None:
+    if ADMIN_USERS and update.effective_user.id not in ADMIN_USERS:
+        await send_queue.reply(update, "Only admins can see bot statistics.")
+        return
+    await send_queue.reply(update, format_stats())
+
+@restricted
+@command_limiter.limit('pause')
+async def pause_torrents(update: Update, context: CallbackContext) -> None:
+    await apply_to_torrents(update, context, 'paused', lambda torrent_hashes: aqb.torrents_pause(torrent_hashes=torrent_hashes))
+
+@restricted
+@command_limiter.limit('resume')
+async def resume_torrents(update: Update, context: CallbackContext) -> None:
+    await apply_to_torrents(update, context, 'resumed', lambda torrent_hashes: aqb.torrents_resume(torrent_hashes=torrent_hashes))
+
+async def post_init(application: Application) -> None:
+    send_queue.start(application.bot)
+    await snapshot_store.load()
+    snapshot_store.start()
+    torrent_cache.start()
+    pipeline.start()
+    scheduler.start()
+    search_indexer.start()
+    await metrics_server.start()
+
+async def post_shutdown(application: Application) -> None:
+    await watch_manager.stop()
+    await search_indexer.stop()
+    await scheduler.stop()
+    await pipeline.stop()
+    await torrent_cache.stop()
+    await snapshot_store.stop()
+    await metrics_server.stop()
+    move_engine.shutdown()
+    aqb.shutdown()
 
 def main() -> None:
     # Set up the Application
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
+    application = Application.builder().token(TELEGRAM_TOKEN).concurrent_updates(ChatOrderedUpdateProcessor(MAX_CONCURRENT_UPDATES)).post_init(post_init).post_shutdown(post_shutdown).build()
 
     # on different commands - answer in Telegram
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("add", add_torrent))
+    application.add_handler(MessageHandler(filters.Document.FileExtension("torrent"), add_torrent_file))
     application.add_handler(CommandHandler("move", move_file))
     application.add_handler(CommandHandler("status", status))
+    application.add_handler(CallbackQueryHandler(status_page, pattern=r'^status:'))
+    application.add_handler(CommandHandler("watch", watch))
+    application.add_handler(CommandHandler("unwatch", unwatch))
     application.add_handler(CommandHandler("remove", remove_torrent))
+    application.add_handler(CommandHandler("pause", pause_torrents))
+    application.add_handler(CommandHandler("resume", resume_torrents))
+    application.add_handler(CommandHandler("search", search))
+    application.add_handler(CommandHandler("stats", stats))
 
-    # Start the Bot
-    application.run_polling()
+    # Start the Bot, long polling or behind a webhook depending on BOT_MODE
+    run(
+        application,
+        mode=BOT_MODE,
+        webhook_url=WEBHOOK_URL,
+        listen=WEBHOOK_LISTEN,
+        port=WEBHOOK_PORT,
+        url_path=WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET_TOKEN,
+        unix_socket=WEBHOOK_UNIX_SOCKET,
+    )
 
 if __name__ == '__main__':
     main()
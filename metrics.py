@@ -0,0 +1,216 @@
+import asyncio
+import contextlib
+import logging
+import math
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, for latencies from a cache hit to a slow Web API call
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Recent observations kept per label set for the /stats percentiles
+SAMPLE_SIZE = 1024
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+
+
+class Gauge:
+    kind = 'gauge'
+
+    def __init__(self, name, help, callback):
+        self.name = name
+        self.help = help
+        self.labels = ()
+        self.callback = callback
+
+    def render(self):
+        yield f"{self.name} {_format_value(self.callback())}"
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        # label values -> [bucket counts, sum, count, recent samples]
+        self.series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * len(self.buckets), 0.0, 0, deque(maxlen=SAMPLE_SIZE)]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+        series[3].append(value)
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def percentiles(self, key, quantiles=(0.5, 0.95, 0.99)):
+        samples = self.series[key][3]
+        return [percentile(samples, q) for q in quantiles]
+
+    def render(self):
+        for key, (counts, total, count, samples) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, key, [('le', _format_value(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name, help, callback):
+        return self._register(Gauge(name, help, callback))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def render(self):
+        # Prometheus text exposition format
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HANDLER_LATENCY = REGISTRY.histogram('telbot_handler_seconds', 'Time spent in command handlers', labels=('handler',))
+QB_CALL_LATENCY = REGISTRY.histogram('telbot_qbittorrent_call_seconds', 'qBittorrent Web API call latency, including response parsing', labels=('method',))
+QB_CALL_ERRORS = REGISTRY.counter('telbot_qbittorrent_call_errors_total', 'qBittorrent Web API calls that raised', labels=('method',))
+CACHE_REQUESTS = REGISTRY.counter('telbot_cache_requests_total', 'Cache lookups by cache and result (hit/miss)', labels=('cache', 'result'))
+MOVE_BYTES = REGISTRY.counter('telbot_move_bytes_total', 'Bytes moved by the move engine')
+MOVE_THROUGHPUT = REGISTRY.histogram(
+    'telbot_move_bytes_per_second', 'Throughput of finished move jobs',
+    buckets=(1e6, 1e7, 5e7, 1e8, 2.5e8, 5e8, 1e9),
+)
+
+
+def format_stats(registry=REGISTRY):
+    # Plain-text summary for the /stats command
+    lines = []
+    for metric in registry.metrics.values():
+        if isinstance(metric, Histogram) and metric.series:
+            lines.append(f"{metric.name}:")
+            scale, unit = (1e-6, 'MB/s') if metric is MOVE_THROUGHPUT else (1e3, 'ms')
+            for key, series in sorted(metric.series.items()):
+                p50, p95, p99 = (value * scale for value in metric.percentiles(key))
+                label = ', '.join(key) or 'all'
+                lines.append(f"  {label}: n={series[2]} p50={p50:.1f} p95={p95:.1f} p99={p99:.1f} {unit}")
+        elif isinstance(metric, Gauge):
+            lines.append(f"{metric.name}: {metric.callback()}")
+
+    caches = {}
+    for (cache, result), count in CACHE_REQUESTS.values.items():
+        caches.setdefault(cache, {})[result] = count
+    for cache, results in sorted(caches.items()):
+        total = sum(results.values())
+        lines.append(f"{cache} cache hit ratio: {results.get('hit', 0) / total:.1%} of {total}")
+    return '\n'.join(lines) or 'No metrics recorded yet.'
+
+
+async def _handle(registry, reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=10)
+        # Headers are not needed, but must be read before answering
+        while (await asyncio.wait_for(reader.readline(), timeout=10)).strip():
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+            status, body = '200 OK', registry.render().encode()
+        else:
+            status, body = '404 Not Found', b'Not Found\n'
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError) as e:
+        logger.debug(f"Metrics request failed: {e}")
+    finally:
+        writer.close()
+
+
+# Serves GET /metrics on a local port for Prometheus to scrape
+class MetricsServer:
+    def __init__(self, registry=REGISTRY, host='127.0.0.1', port=9877):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        if self.port is None or self.server is not None:
+            return
+        self.server = await asyncio.start_server(lambda reader, writer: _handle(self.registry, reader, writer), self.host, self.port)
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
@@ -5,6 +5,8 @@ from telegram import Update
 from telegram.ext import Updater, CommandHandler, CallbackContext, MessageHandler, Filters, ConversationHandler
 import qbittorrentapi
 from config import TELEGRAM_TOKEN, ALLOWED_USERS, QBITTORRENT_HOST, QBITTORRENT_USERNAME, QBITTORRENT_PASSWORD
+from mover import move_path
+from qb_session import SessionManager
 
 # Enable logging
 logging.basicConfig(
@@ -13,13 +15,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Initialize qBittorrent client
-qb = qbittorrentapi.Client(host=QBITTORRENT_HOST, username=QBITTORRENT_USERNAME, password=QBITTORRENT_PASSWORD)
-
-try:
-    qb.auth_log_in()
-except qbittorrentapi.LoginFailed as e:
-    logger.error(f"Failed to log in to qBittorrent: {e}")
+# Initialize qBittorrent client; it logs in lazily, re-authenticates on 403
+# and stops calling qBittorrent for a while when it is down
+qb = SessionManager(QBITTORRENT_HOST, QBITTORRENT_USERNAME, QBITTORRENT_PASSWORD)
 
 # Security decorator
 def restricted(func):
@@ -157,11 +155,17 @@ def destination_received(update: Update, context: CallbackContext) -> int:
         for torrent in torrents:
             if torrent_name == torrent.name:
                 files = qb.torrents_files(torrent_hash=torrent.hash)
+                moved_files = []
                 for file in files:
                     if fnmatch.fnmatch(file.name, file_pattern):
-                        source_path = os.path.join('/path/to/torrent/downloads', file.name)
-                        os.rename(source_path, os.path.join(destination_path, os.path.basename(file.name)))
-                        update.message.reply_text(f'Moved {file.name} to {destination_path}')
+                        source_path = os.path.join(torrent.save_path, file.name)
+                        move_path(source_path, os.path.join(destination_path, os.path.basename(file.name)))
+                        moved_files.append(file.name)
+                if moved_files:
+                    moved_files_message = '\n'.join(moved_files)
+                    update.message.reply_text(f'Moved files:\n{moved_files_message}\nto {destination_path}')
+                else:
+                    update.message.reply_text('No files matching the pattern were found.')
                 return ConversationHandler.END
         update.message.reply_text('Torrent not found.')
     except qbittorrentapi.APIConnectionError:
@@ -0,0 +1,205 @@
+import asyncio
+import errno
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from coordination import KeyedLocks
+from metrics import MOVE_BYTES, MOVE_THROUGHPUT
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 16 * 1024 * 1024
+# Errors meaning the zero-copy syscall is unusable for this pair of files
+FALLBACK_ERRNOS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP)
+
+
+def format_size(num_bytes):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(num_bytes) < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TiB"
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def _copy_file(source_path, destination_path, progress):
+    # Kernel-side copy: copy_file_range, then sendfile, then plain read/write
+    methods = ['copy_file_range', 'sendfile', 'readwrite']
+    if not hasattr(os, 'copy_file_range'):
+        methods.remove('copy_file_range')
+    with open(source_path, 'rb') as fsrc, open(destination_path, 'wb') as fdst:
+        src_fd, dst_fd = fsrc.fileno(), fdst.fileno()
+        size = os.fstat(src_fd).st_size
+        offset = 0
+        while offset < size:
+            count = min(CHUNK_SIZE, size - offset)
+            method = methods[0]
+            try:
+                if method == 'copy_file_range':
+                    copied = os.copy_file_range(src_fd, dst_fd, count, offset, offset)
+                elif method == 'sendfile':
+                    os.lseek(dst_fd, offset, os.SEEK_SET)
+                    copied = os.sendfile(dst_fd, src_fd, offset, count)
+                else:
+                    os.lseek(src_fd, offset, os.SEEK_SET)
+                    os.lseek(dst_fd, offset, os.SEEK_SET)
+                    copied = os.write(dst_fd, os.read(src_fd, count))
+            except OSError as e:
+                if e.errno in FALLBACK_ERRNOS and len(methods) > 1:
+                    methods.pop(0)
+                    continue
+                raise
+            if copied == 0:
+                break
+            offset += copied
+            progress(copied)
+    shutil.copystat(source_path, destination_path)
+
+
+def move_path(source_path, destination_path, progress=None):
+    # Rename when possible; across devices copy to a temporary name, then unlink
+    progress = progress or (lambda num_bytes: None)
+    try:
+        size = os.path.getsize(source_path) if os.path.isfile(source_path) else 0
+        os.rename(source_path, destination_path)
+        progress(size)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    if os.path.isdir(source_path):
+        shutil.move(source_path, destination_path)
+        return
+
+    partial_path = destination_path + '.part'
+    try:
+        _copy_file(source_path, partial_path, progress)
+        os.replace(partial_path, destination_path)
+    except BaseException:
+        try:
+            os.unlink(partial_path)
+        except OSError:
+            pass
+        raise
+    os.unlink(source_path)
+
+
+# Progress counters for one batch of moves, updated from worker threads
+class MoveJob:
+    def __init__(self, moves):
+        self.moves = moves
+        self.total_bytes = 0
+        self.done_bytes = 0
+        self.files_done = 0
+        self.moved = []
+        self.failed = []
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add_bytes(self, num_bytes):
+        with self._lock:
+            self.done_bytes += num_bytes
+
+    def describe(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        rate = self.done_bytes / elapsed
+        text = (
+            f"Moving files: {self.files_done}/{len(self.moves)}\n"
+            f"{format_size(self.done_bytes)} of {format_size(self.total_bytes)} at {format_size(rate)}/s"
+        )
+        if rate > 0 and self.done_bytes < self.total_bytes:
+            text += f", ETA {format_duration((self.total_bytes - self.done_bytes) / rate)}"
+        return text
+
+
+# Runs moves on a worker pool, with at most `per_device` concurrent moves
+# landing on the same destination filesystem.
+class MoveEngine:
+    def __init__(self, max_workers=4, per_device=2, report_interval=3):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='mover')
+        self.per_device = per_device
+        self.report_interval = report_interval
+        self.device_limits = {}
+        # Concurrent commands must not move the same file or write the same target
+        self.path_locks = KeyedLocks()
+
+    def _device_limit(self, device):
+        limit = self.device_limits.get(device)
+        if limit is None:
+            limit = self.device_limits[device] = asyncio.Semaphore(self.per_device)
+        return limit
+
+    @staticmethod
+    def _stat_move(source_path, destination_path):
+        size = os.path.getsize(source_path) if os.path.isfile(source_path) else 0
+        device = os.stat(os.path.dirname(destination_path) or '.').st_dev
+        return size, device
+
+    async def _move_one(self, job, source_path, destination_path, device):
+        loop = asyncio.get_running_loop()
+        try:
+            async with self.path_locks.hold(source_path, destination_path), self._device_limit(device):
+                await loop.run_in_executor(self.executor, move_path, source_path, destination_path, job.add_bytes)
+            job.moved.append((source_path, destination_path))
+        except Exception as e:
+            logger.warning(f"Failed to move {source_path} to {destination_path}: {e}")
+            job.failed.append((source_path, e))
+        job.files_done += 1
+
+    async def _report(self, job, message):
+        last_text = None
+        while True:
+            await asyncio.sleep(self.report_interval)
+            text = job.describe()
+            if text != last_text:
+                try:
+                    await message.edit_text(text)
+                    last_text = text
+                except Exception as e:
+                    logger.debug(f"Progress update failed: {e}")
+
+    async def move_many(self, moves, message=None):
+        # `moves` is a list of (source_path, destination_path); when `message`
+        # is given it is edited in place with throughput and ETA
+        loop = asyncio.get_running_loop()
+        job = MoveJob(moves)
+        stats = await asyncio.gather(
+            *(loop.run_in_executor(self.executor, self._stat_move, source, destination) for source, destination in moves),
+            return_exceptions=True,
+        )
+        pending = []
+        for (source, destination), stat in zip(moves, stats):
+            if isinstance(stat, Exception):
+                job.failed.append((source, stat))
+                job.files_done += 1
+                continue
+            size, device = stat
+            job.total_bytes += size
+            pending.append(self._move_one(job, source, destination, device))
+
+        reporter = asyncio.create_task(self._report(job, message)) if message is not None else None
+        try:
+            await asyncio.gather(*pending)
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+        MOVE_BYTES.inc(job.done_bytes)
+        if job.done_bytes:
+            MOVE_THROUGHPUT.observe(job.done_bytes / max(time.monotonic() - job.started_at, 1e-6))
+        return job
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
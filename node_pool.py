@@ -0,0 +1,257 @@
+import asyncio
+import functools
+import logging
+
+from qb_async import AsyncQBittorrent
+from qb_session import SessionManager
+from torrent_cache import TorrentCache
+from torrent_index import TorrentIndex
+
+logger = logging.getLogger(__name__)
+
+# Keyword arguments that name the torrent(s) a Web API call applies to
+SINGLE_HASH_ARGUMENTS = ('torrent_hash', 'hash')
+MULTI_HASH_ARGUMENTS = ('torrent_hashes', 'hashes')
+ACTIVE_STATES = {'downloading', 'forcedDL', 'metaDL', 'checkingDL', 'moving'}
+
+
+class Node:
+    def __init__(self, name, session, aqb, cache):
+        self.name = name
+        self.session = session
+        self.aqb = aqb
+        self.cache = cache
+
+
+def create_nodes(node_configs, max_workers=8, refresh_interval=5, max_staleness=15):
+    # node_configs: [{'name', 'host', 'username', 'password'}, ...]
+    nodes = []
+    for node_config in node_configs:
+        session = SessionManager(node_config['host'], node_config['username'], node_config['password'], pool_size=max_workers)
+        aqb = AsyncQBittorrent(session, max_workers=max_workers)
+        cache = TorrentCache(aqb, refresh_interval=refresh_interval, max_staleness=max_staleness)
+        nodes.append(Node(node_config.get('name', node_config['host']), session, aqb, cache))
+    return nodes
+
+
+def _log_late_failure(node, task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Refresh of qBittorrent node {node.name} failed: {task.exception()}")
+
+
+# One merged torrent table over every node's TorrentCache, with the same
+# interface as a single TorrentCache. Each torrent dict is shared with its
+# node's cache and carries a 'node' key. A torrent cross-seeded on several
+# nodes is shown once, from one of them, and stays in the table until the
+# last node drops it. Refreshes go to all stale nodes in parallel; a node that
+# does not answer within `timeout` keeps refreshing in the background while
+# the caller gets that node's last known torrents.
+class PooledTorrentCache:
+    def __init__(self, nodes, timeout=3):
+        self.nodes = list(nodes)
+        self.nodes_by_name = {node.name: node for node in self.nodes}
+        self.timeout = timeout
+        self.torrents = {}
+        # hash -> set of nodes that have the torrent
+        self.owners = {}
+        self.index = TorrentIndex()
+        self.listeners = []
+        for node in self.nodes:
+            node.cache.add_listener(functools.partial(self._on_node_changed, node))
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def _on_node_changed(self, node, changed, removed):
+        merged_changes = {}
+        merged_removed = []
+        for torrent_hash in removed:
+            owners = self.owners.get(torrent_hash)
+            if owners is None or node not in owners:
+                continue
+            owners.discard(node)
+            if owners:
+                if self.torrents[torrent_hash].get('node') == node.name:
+                    # Still seeded elsewhere; that node's entry takes over
+                    torrent = next(iter(owners)).cache.torrents[torrent_hash]
+                    self.torrents[torrent_hash] = torrent
+                    merged_changes[torrent_hash] = dict(torrent)
+                continue
+            del self.owners[torrent_hash]
+            self.torrents.pop(torrent_hash, None)
+            self.index.remove(torrent_hash)
+            merged_removed.append(torrent_hash)
+        names = []
+        for torrent_hash, changes in changed.items():
+            torrent = node.cache.torrents.get(torrent_hash)
+            if torrent is None:
+                continue
+            torrent['node'] = node.name
+            self.owners.setdefault(torrent_hash, set()).add(node)
+            current = self.torrents.setdefault(torrent_hash, torrent)
+            if current is not torrent:
+                # Deltas of a copy on another node do not change the merged entry
+                if current.get('node') != node.name:
+                    continue
+                # This node's cache replaced its dict; the merged table follows
+                self.torrents[torrent_hash] = torrent
+                changes = dict(torrent)
+            merged_changes[torrent_hash] = changes
+            if 'name' in changes:
+                names.append((torrent_hash, changes['name']))
+        self.index.add_many(names)
+        for callback in self.listeners:
+            try:
+                callback(merged_changes, merged_removed)
+            except Exception as e:
+                logger.exception(f"Torrent cache listener failed: {e}")
+
+    def owner(self, torrent_hash):
+        # The node whose entry is in the merged table
+        torrent = self.torrents.get(torrent_hash)
+        return self.nodes_by_name.get(torrent['node']) if torrent is not None else None
+
+    def all_owners(self, torrent_hash):
+        return self.owners.get(torrent_hash, set())
+
+    def is_stale(self, max_age=None):
+        return any(node.cache.is_stale(max_age) for node in self.nodes)
+
+    @property
+    def synced(self):
+        return all(node.cache.synced for node in self.nodes)
+
+    async def _fan_out(self, nodes, refresh):
+        tasks = {node: asyncio.ensure_future(refresh(node)) for node in nodes}
+        if not tasks:
+            return
+        done, pending = await asyncio.wait(tasks.values(), timeout=self.timeout)
+        for node, task in tasks.items():
+            if task in pending:
+                logger.info(f"qBittorrent node {node.name} did not answer within {self.timeout}s, using its cached torrents")
+                task.add_done_callback(functools.partial(_log_late_failure, node))
+            elif task.exception() is not None:
+                logger.warning(f"Refresh of qBittorrent node {node.name} failed: {task.exception()}")
+
+    async def refresh(self, max_age=None):
+        await self._fan_out(self.nodes, lambda node: node.cache.refresh(max_age))
+
+    async def ensure_fresh(self, max_age=None):
+        stale = [node for node in self.nodes if node.cache.is_stale(max_age)]
+        await self._fan_out(stale, lambda node: node.cache.ensure_fresh(max_age))
+
+    async def get_torrents(self, max_age=None):
+        await self.ensure_fresh(max_age)
+        return list(self.torrents.values())
+
+    async def find(self, query, max_age=None):
+        await self.ensure_fresh(max_age)
+        return [self.torrents[torrent_hash] for torrent_hash in self.index.lookup(query)]
+
+    def discard(self, torrent_hashes):
+        by_node = {}
+        for torrent_hash in torrent_hashes:
+            for node in self.all_owners(torrent_hash):
+                by_node.setdefault(node, []).append(torrent_hash)
+        for node, hashes in by_node.items():
+            node.cache.discard(hashes)
+
+    def snapshot(self):
+        return {node.name: node.cache.snapshot() for node in self.nodes}
+
+    def restore(self, data, age):
+        for node in self.nodes:
+            if node.name in data:
+                node.cache.restore(data[node.name], age)
+
+    def start(self):
+        for node in self.nodes:
+            node.cache.start()
+
+    async def stop(self):
+        await asyncio.gather(*(node.cache.stop() for node in self.nodes))
+
+
+# Drop-in for AsyncQBittorrent over several nodes: a call naming one torrent
+# goes to the node shown in the merged table, calls naming several go to every
+# node that has them (so /pause or /remove reach cross-seeded copies too), new
+# torrents go to the node with the most free disk space (then the fewest
+# active downloads), anything else to the first node. Unknown hashes trigger
+# a refresh before a call is sent anywhere, since qBittorrent accepts writes
+# for hashes it does not have without an error.
+class PooledQBittorrent:
+    def __init__(self, torrent_cache):
+        self.torrent_cache = torrent_cache
+        self.nodes = torrent_cache.nodes
+
+    def choose_node(self):
+        # Nodes whose circuit breaker is open are only used when all are down
+        candidates = [node for node in self.nodes if node.session.available] or self.nodes
+
+        def score(node):
+            free_space = node.cache.server_state.get('free_space_on_disk', -1)
+            active = sum(1 for torrent in node.cache.torrents.values() if torrent.get('state') in ACTIVE_STATES)
+            return free_space, -active
+
+        return max(candidates, key=score)
+
+    async def _call_any(self, method, args, kwargs):
+        # Hash still unknown after a refresh: ask each node until one answers
+        error = None
+        for node in self.nodes:
+            try:
+                return await node.aqb.call(method, *args, **kwargs)
+            except Exception as e:
+                error = e
+        raise error
+
+    async def call(self, method, *args, **kwargs):
+        if method == 'torrents_add':
+            node = self.choose_node()
+            logger.info(f"Adding torrents on qBittorrent node {node.name}")
+            return await node.aqb.call(method, *args, **kwargs)
+
+        for argument in SINGLE_HASH_ARGUMENTS:
+            if argument in kwargs:
+                node = self.torrent_cache.owner(kwargs[argument])
+                if node is None:
+                    await self.torrent_cache.refresh()
+                    node = self.torrent_cache.owner(kwargs[argument])
+                if node is None:
+                    return await self._call_any(method, args, kwargs)
+                return await node.aqb.call(method, *args, **kwargs)
+
+        for argument in MULTI_HASH_ARGUMENTS:
+            if argument in kwargs:
+                return await self._call_split(method, argument, args, kwargs)
+
+        return await self.nodes[0].aqb.call(method, *args, **kwargs)
+
+    async def _call_split(self, method, argument, args, kwargs):
+        value = kwargs[argument]
+        hashes = value.split('|') if isinstance(value, str) else list(value)
+        if hashes != ['all'] and not all(self.torrent_cache.all_owners(torrent_hash) for torrent_hash in hashes):
+            await self.torrent_cache.refresh()
+        by_node = {}
+        for torrent_hash in hashes:
+            # Hashes still unknown go to every node
+            for target in self.torrent_cache.all_owners(torrent_hash) or self.nodes:
+                by_node.setdefault(target, []).append(torrent_hash)
+
+        calls = []
+        for node, node_hashes in by_node.items():
+            node_kwargs = dict(kwargs, **{argument: '|'.join(node_hashes) if isinstance(value, str) else node_hashes})
+            calls.append(node.aqb.call(method, *args, **node_kwargs))
+        results = await asyncio.gather(*calls)
+        if results and all(isinstance(result, list) for result in results):
+            return [item for result in results for item in result]
+        return results[0] if len(results) == 1 else None
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+        return functools.partial(self.call, method)
+
+    def shutdown(self):
+        for node in self.nodes:
+            node.aqb.shutdown()
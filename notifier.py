@@ -0,0 +1,97 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+ERROR_STATES = {'error', 'missingFiles'}
+STALLED_STATES = {'stalledDL'}
+
+
+def classify(torrent):
+    state = torrent.get('state')
+    if state in ERROR_STATES:
+        return 'errored'
+    if torrent.get('progress', 0) >= 1:
+        return 'completed'
+    if state in STALLED_STATES:
+        return 'stalled'
+    return 'active'
+
+
+# Watches torrent cache deltas for transitions into completed, errored or
+# stalled and pushes a message to the chat that added the torrent. All users
+# share the cache's single poll; `adders` maps info-hash -> chat id.
+class Notifier:
+    def __init__(self, send_queue, torrent_cache, default_chats=(), stalled_cooldown=3600):
+        self.send_queue = send_queue
+        self.torrent_cache = torrent_cache
+        self.default_chats = list(default_chats)
+        self.stalled_cooldown = stalled_cooldown
+        self.adders = {}
+        self.classes = {}
+        self.stalled_at = {}
+        self.subscribers = []
+        self.primed = False
+        self.on_record = None
+
+    def record(self, chat_id, torrent_hashes):
+        for torrent_hash in torrent_hashes:
+            if torrent_hash:
+                self.adders[torrent_hash.lower()] = chat_id
+        if self.on_record is not None:
+            self.on_record()
+
+    def subscribe(self, callback):
+        # callback(event, torrent) for every transition, whoever added the torrent
+        self.subscribers.append(callback)
+
+    def snapshot(self):
+        return {'adders': self.adders, 'classes': self.classes}
+
+    def restore(self, data, age):
+        # Known classes let torrents that finished while the bot was down still notify
+        self.adders.update(data['adders'])
+        self.classes.update(data['classes'])
+        self.primed = bool(self.classes)
+
+    def on_torrents_changed(self, changed, removed):
+        for torrent_hash in removed:
+            self.classes.pop(torrent_hash, None)
+            self.stalled_at.pop(torrent_hash, None)
+            self.adders.pop(torrent_hash, None)
+
+        for torrent_hash, changes in changed.items():
+            if 'state' not in changes and 'progress' not in changes:
+                continue
+            torrent = self.torrent_cache.torrents.get(torrent_hash)
+            if torrent is None:
+                continue
+            # Torrents present at startup are only recorded; later additions start out active
+            previous = self.classes.get(torrent_hash, 'active' if self.primed else None)
+            current = self.classes[torrent_hash] = classify(torrent)
+            if previous is None or previous == current or current == 'active':
+                continue
+            if current == 'stalled':
+                now = time.monotonic()
+                if now - self.stalled_at.get(torrent_hash, -self.stalled_cooldown) < self.stalled_cooldown:
+                    continue
+                self.stalled_at[torrent_hash] = now
+            self._emit(current, torrent)
+        self.primed = True
+
+    def _emit(self, event, torrent):
+        for callback in self.subscribers:
+            try:
+                callback(event, torrent)
+            except Exception as e:
+                logger.exception(f"Notification subscriber failed: {e}")
+
+        chat_id = self.adders.get(torrent['hash'])
+        chats = [chat_id] if chat_id is not None else self.default_chats
+        text = {
+            'completed': f"✅ Download finished: {torrent.get('name')}",
+            'errored': f"❌ Torrent errored ({torrent.get('state')}): {torrent.get('name')}",
+            'stalled': f"⏸ Download stalled at {torrent.get('progress', 0)*100:.1f}%: {torrent.get('name')}",
+        }[event]
+        for chat in chats:
+            self.send_queue.send_nowait(chat, text)
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from fnmatch import fnmatchcase
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+
+def rule_matches(rule, torrent):
+    match = rule.get('match', {})
+    if 'category' in match and torrent.get('category', '') != match['category']:
+        return False
+    if 'tag' in match and match['tag'] not in [tag.strip() for tag in torrent.get('tags', '').split(',')]:
+        return False
+    if 'tracker' in match and match['tracker'] not in torrent.get('tracker', ''):
+        return False
+    if 'glob' in match and not fnmatchcase(torrent.get('name', '').casefold(), match['glob'].casefold()):
+        return False
+    return True
+
+
+def _link_files(links):
+    for source_path, link_path in links:
+        os.makedirs(os.path.dirname(link_path), exist_ok=True)
+        if not os.path.exists(link_path):
+            os.link(source_path, link_path)
+
+
+# Runs the actions of rules.py when a torrent completes. Every step of every
+# matching rule is a job, served by a fixed number of workers. At most
+# `queue_size` jobs may be unfinished at once; rules for further completions
+# are skipped with a warning. Unfinished jobs are written to `state_path` so
+# queued work survives a restart, and run once the torrent cache has synced
+# with qBittorrent. A 'remove' step whose ratio has not been reached yet
+# waits until the torrent cache reports a ratio change.
+class Pipeline:
+    def __init__(self, aqb, torrent_cache, file_cache, client_mover, rules, state_path, workers=2, queue_size=100):
+        self.aqb = aqb
+        self.torrent_cache = torrent_cache
+        self.file_cache = file_cache
+        self.client_mover = client_mover
+        self.rules = {rule['name']: rule for rule in rules}
+        self.state_path = state_path
+        self.worker_count = workers
+        self.queue_size = queue_size
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.jobs = {}
+        self.backlog = deque()
+        self.waiting = {}
+        self.wakeup = asyncio.Event()
+        self.tasks = []
+        self.actions = {
+            'move': self._move,
+            'hardlink': self._hardlink,
+            'remove': self._remove,
+        }
+
+    def load(self):
+        try:
+            with open(self.state_path) as f:
+                jobs = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read pipeline state {self.state_path}: {e}")
+            return
+        for job in jobs:
+            if job['rule'] not in self.rules:
+                continue
+            self.jobs[job['id']] = job
+            if job.get('waiting'):
+                self.waiting.setdefault(job['hash'], []).append(job['id'])
+            else:
+                self.backlog.append(job['id'])
+        if self.jobs:
+            logger.info(f"Resuming {len(self.jobs)} pipeline job(s)")
+
+    def save(self):
+        partial_path = self.state_path + '.tmp'
+        with open(partial_path, 'w') as f:
+            json.dump(list(self.jobs.values()), f)
+        os.replace(partial_path, self.state_path)
+
+    def on_event(self, event, torrent):
+        # Notifier subscriber
+        if event != 'completed':
+            return
+        for rule in self.rules.values():
+            if rule.get('actions') and rule_matches(rule, torrent):
+                self.submit(torrent['hash'], rule['name'])
+
+    def on_torrents_changed(self, changed, removed):
+        for torrent_hash in removed:
+            for job_id in self.waiting.pop(torrent_hash, []):
+                self.jobs.pop(job_id, None)
+        for torrent_hash, changes in changed.items():
+            if 'ratio' in changes and torrent_hash in self.waiting:
+                for job_id in self.waiting.pop(torrent_hash):
+                    self.jobs[job_id]['waiting'] = False
+                    self._schedule(job_id)
+        if removed:
+            self.save()
+
+    def submit(self, torrent_hash, rule_name):
+        if len(self.jobs) >= self.queue_size:
+            logger.warning(f"Pipeline queue is full ({len(self.jobs)} jobs), skipping rule '{rule_name}' for {torrent_hash}")
+            return
+        job = {'id': uuid.uuid4().hex, 'hash': torrent_hash, 'rule': rule_name, 'step': 0, 'attempts': 0, 'waiting': False}
+        self.jobs[job['id']] = job
+        self._schedule(job['id'])
+        self.save()
+
+    def _schedule(self, job_id):
+        self.backlog.append(job_id)
+        self.wakeup.set()
+
+    async def _wait_for_sync(self):
+        # Until the first sync the table is empty or restored from a snapshot, so
+        # a missing torrent may simply not be known yet rather than removed. The
+        # pool's refresh() logs node failures instead of raising, so check that
+        # every node has really synced
+        while True:
+            try:
+                await self.torrent_cache.refresh()
+            except Exception as e:
+                logger.warning(f"Pipeline waiting for the torrent cache: {e}")
+            if self.torrent_cache.synced:
+                return
+            logger.info("Pipeline waiting for the first sync with qBittorrent")
+            await asyncio.sleep(5)
+
+    async def _feed(self):
+        # Moves scheduled jobs into the queue, waiting while it is full
+        await self._wait_for_sync()
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.backlog:
+                await self.queue.put(self.backlog.popleft())
+
+    async def _work(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                job = self.jobs.get(job_id)
+                if job is not None:
+                    await self._run(job)
+            except Exception as e:
+                logger.exception(f"Pipeline worker failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job):
+        rule = self.rules[job['rule']]
+        action = rule['actions'][job['step']]
+        torrent = self.torrent_cache.torrents.get(job['hash'])
+        if torrent is None:
+            # Torrent is gone, nothing left to do
+            del self.jobs[job['id']]
+            self.save()
+            return
+
+        try:
+            done = await self.actions[action['type']](action, torrent)
+        except Exception as e:
+            job['attempts'] += 1
+            logger.warning(f"Rule '{rule['name']}' {action['type']} failed for {torrent.get('name')} (attempt {job['attempts']}): {e}")
+            if job['attempts'] >= MAX_ATTEMPTS:
+                del self.jobs[job['id']]
+            else:
+                asyncio.get_running_loop().call_later(30 * job['attempts'], self._schedule, job['id'])
+            self.save()
+            return
+
+        if not done:
+            job['waiting'] = True
+            self.waiting.setdefault(job['hash'], []).append(job['id'])
+        elif job['step'] + 1 < len(rule['actions']):
+            job['step'] += 1
+            job['attempts'] = 0
+            self._schedule(job['id'])
+        else:
+            del self.jobs[job['id']]
+        self.save()
+
+    async def _move(self, action, torrent):
+        job = await self.client_mover.relocate({torrent['hash']: torrent}, action['destination'])
+        if job.failed:
+            raise job.failed[0][1]
+        return True
+
+    async def _hardlink(self, action, torrent):
+        pattern = action.get('glob', '*')
+        files = await self.file_cache.get(torrent['hash'])
+        links = [
+            (os.path.join(torrent['save_path'], file['name']), os.path.join(action['destination'], file['name']))
+            for file in files
+            if fnmatchcase(file['name'], pattern)
+        ]
+        await asyncio.get_running_loop().run_in_executor(None, _link_files, links)
+        return True
+
+    async def _remove(self, action, torrent):
+        if torrent.get('ratio', 0) < action.get('ratio', 0):
+            return False
+        await self.aqb.torrents_delete(delete_files=action.get('delete_files', False), torrent_hashes=torrent['hash'])
+        self.torrent_cache.discard([torrent['hash']])
+        return True
+
+    def start(self):
+        if not self.rules or self.tasks:
+            return
+        self.load()
+        self.tasks.append(asyncio.create_task(self._feed()))
+        self.tasks.extend(asyncio.create_task(self._work()) for _ in range(self.worker_count))
+        if self.backlog:
+            self.wakeup.set()
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
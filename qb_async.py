@@ -0,0 +1,47 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from coordination import SingleFlight
+from metrics import QB_CALL_ERRORS, QB_CALL_LATENCY
+
+# Calls without side effects; identical ones in flight at the same time share one request
+READ_METHODS = frozenset({
+    'app_preferences', 'app_version', 'sync_maindata', 'sync_torrent_peers',
+    'torrents_categories', 'torrents_files', 'torrents_info', 'torrents_piece_states',
+    'torrents_properties', 'torrents_tags', 'torrents_trackers', 'transfer_info',
+})
+
+
+# Runs the blocking qBittorrent Web API client (or a SessionManager wrapping
+# it) on a bounded thread pool. Any client method can be awaited directly,
+# e.g. `await aqb.torrents_info()`.
+class AsyncQBittorrent:
+    def __init__(self, client, max_workers=8):
+        self.client = client
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='qbittorrent')
+        self.single_flight = SingleFlight()
+
+    async def _run(self, method, args, kwargs):
+        loop = asyncio.get_running_loop()
+        func = functools.partial(getattr(self.client, method), *args, **kwargs)
+        with QB_CALL_LATENCY.time(method=method):
+            try:
+                return await loop.run_in_executor(self.executor, func)
+            except Exception:
+                QB_CALL_ERRORS.inc(method=method)
+                raise
+
+    async def call(self, method, *args, **kwargs):
+        if method not in READ_METHODS:
+            return await self._run(method, args, kwargs)
+        key = repr((method, args, sorted(kwargs.items())))
+        return await self.single_flight.run(key, lambda: self._run(method, args, kwargs))
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+        return functools.partial(self.call, method)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
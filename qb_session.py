@@ -0,0 +1,124 @@
+import functools
+import logging
+import random
+import threading
+import time
+
+import qbittorrentapi
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(qbittorrentapi.APIConnectionError):
+    pass
+
+
+def create_client(host, username, password, pool_size=8):
+    # One requests session with a keep-alive connection pool shared by all workers
+    return qbittorrentapi.Client(
+        host=host,
+        username=username,
+        password=password,
+        HTTPADAPTER_ARGS={'pool_connections': pool_size, 'pool_maxsize': pool_size},
+    )
+
+
+def _is_connection_failure(error):
+    # 4xx responses (unknown hash, conflicts...) mean the WebUI is up and answering
+    return isinstance(error, qbittorrentapi.APIConnectionError) and not isinstance(error, qbittorrentapi.HTTP4XXError)
+
+
+# Owns the qBittorrent client: logs in on first use instead of at import time,
+# logs in again when a call is answered with 403 (expired cookie), and trips a
+# circuit breaker after repeated connection failures. While the circuit is
+# open calls fail fast with CircuitOpenError; it half-opens for a single trial
+# call after a jittered, exponentially growing delay.
+class SessionManager:
+    def __init__(self, host, username, password, pool_size=8, failure_threshold=5, reset_timeout=5, max_reset_timeout=300):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.pool_size = pool_size
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self._client = None
+        self._logged_in = False
+        self._failures = 0
+        self._trips = 0
+        self._open_until = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = create_client(self.host, self.username, self.password, pool_size=self.pool_size)
+        return self._client
+
+    @property
+    def available(self):
+        # False while the circuit is open and calls would fail fast
+        return self._failures < self.failure_threshold or time.monotonic() >= self._open_until
+
+    def _before_call(self):
+        with self._lock:
+            if self._failures < self.failure_threshold:
+                return False
+            if time.monotonic() < self._open_until or self._trial_running:
+                raise CircuitOpenError(f"qBittorrent at {self.host} is unavailable, retrying in {max(0, self._open_until - time.monotonic()):.0f}s")
+            # Half-open: let exactly one call through to probe the WebUI
+            self._trial_running = True
+            return True
+
+    def _record_success(self):
+        with self._lock:
+            if self._failures >= self.failure_threshold:
+                logger.info(f"qBittorrent at {self.host} is reachable again")
+            self._failures = 0
+            self._trips = 0
+            self._trial_running = False
+
+    def _record_failure(self, error):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._failures >= self.failure_threshold:
+                self._trips += 1
+                delay = min(self.max_reset_timeout, self.reset_timeout * 2 ** (self._trips - 1))
+                delay *= random.uniform(0.5, 1.5)
+                self._open_until = time.monotonic() + delay
+                self._logged_in = False
+                logger.warning(f"qBittorrent at {self.host} unavailable ({error}), pausing calls for {delay:.0f}s")
+
+    def _login(self):
+        self.client.auth_log_in()
+        self._logged_in = True
+
+    def call(self, method, *args, **kwargs):
+        self._before_call()
+        try:
+            if not self._logged_in:
+                self._login()
+            try:
+                result = getattr(self.client, method)(*args, **kwargs)
+            except qbittorrentapi.Forbidden403Error:
+                # Session cookie expired or qBittorrent restarted
+                self._logged_in = False
+                self._login()
+                result = getattr(self.client, method)(*args, **kwargs)
+        except Exception as e:
+            if _is_connection_failure(e):
+                self._record_failure(e)
+            else:
+                self._record_success()
+            raise
+        self._record_success()
+        return result
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+        return functools.partial(self.call, method)
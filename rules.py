@@ -0,0 +1,28 @@
+# rules.py
+
+# Post-download rules, run by the bot when a torrent finishes downloading.
+#
+# 'match' keys (all optional, every given key must match):
+#   'category' - exact qBittorrent category
+#   'tag'      - one of the torrent's tags
+#   'tracker'  - substring of the torrent's current tracker URL
+#   'glob'     - shell pattern matched against the torrent name (case-insensitive)
+#
+# 'actions' run in order:
+#   {'type': 'move', 'destination': ...}                    - move via qBittorrent (keeps seeding)
+#   {'type': 'hardlink', 'destination': ..., 'glob': ...}   - hardlink matching files, keeping their paths
+#   {'type': 'remove', 'ratio': ..., 'delete_files': ...}   - remove once the ratio is reached
+#
+# Example:
+# RULES = [
+#     {
+#         'name': 'tv',
+#         'match': {'category': 'tv'},
+#         'actions': [
+#             {'type': 'move', 'destination': '/srv/seeding/tv'},
+#             {'type': 'hardlink', 'destination': '/srv/media/tv', 'glob': '*.mkv'},
+#             {'type': 'remove', 'ratio': 2.0, 'delete_files': False},
+#         ],
+#     },
+# ]
+RULES = []
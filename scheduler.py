@@ -0,0 +1,254 @@
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# States of a torrent that was stopped by qBittorrent after receiving metadata, or added paused
+WAITING_STATES = {'pausedDL', 'stoppedDL'}
+STALLED_STATES = {'stalledDL'}
+# Marker tag of torrents added from http(s) URLs until the scheduler learns their hash
+URL_TAG_PREFIX = 'telbot-queued-'
+# Seconds qBittorrent gets to fetch a .torrent URL before the scheduler stops waiting for it
+URL_RESOLVE_TIMEOUT = 3600
+
+
+# Keeps new downloads out of qBittorrent's way until they fit. Magnets are
+# added with stop_condition=MetadataReceived, so qBittorrent learns their size
+# and stops them; .torrent files are added paused. Waiting torrents are
+# grouped by (chat, category), ordered by priority then arrival, and released
+# round-robin across groups with one bulk resume while a download slot is free
+# and the node's free space (minus `reserve` and what active downloads still
+# need) can hold them. A download stalled for `stall_timeout` is paused in the
+# same way and goes back to the end of its queue, handing its slot to the next.
+# A download the user pauses gives its slot back and stays paused. .torrent
+# URLs have no hash until qBittorrent fetches them, so they are added paused
+# with a marker tag and queued when a torrent carrying the tag shows up.
+class DownloadScheduler:
+    def __init__(self, aqb, torrent_cache, slots=3, reserve=10 << 30, interval=10, stall_timeout=600):
+        self.aqb = aqb
+        self.torrent_cache = torrent_cache
+        self.slots = slots
+        self.reserve = reserve
+        self.interval = interval
+        self.stall_timeout = stall_timeout
+        # hash -> [chat_id, priority, sequence number]
+        self.queued = {}
+        # hash -> [chat_id, priority] of downloads released by the scheduler
+        self.active = {}
+        self.stalled_since = {}
+        # hash -> time.monotonic() of the scheduler's resume, not kept across restarts
+        self.released_at = {}
+        # marker tag -> [chat_id, priority, torrents still expected, time.time() of the add]
+        self.unresolved = {}
+        # marker tag -> hashes the tag still has to be removed from
+        self.untag = {}
+        self.sequence = itertools.count()
+        self.on_change = None
+        self._task = None
+
+    @property
+    def enabled(self):
+        return self.slots > 0
+
+    def add_options(self, magnet=True):
+        # Extra torrents_add arguments so new torrents wait for the scheduler
+        if not self.enabled:
+            return {}
+        return {'stop_condition': 'MetadataReceived'} if magnet else {'is_paused': True}
+
+    def submit(self, chat_id, torrent_hashes, priority=0):
+        if not self.enabled:
+            return
+        for torrent_hash in torrent_hashes:
+            if torrent_hash:
+                self.queued[torrent_hash.lower()] = [chat_id, priority, next(self.sequence)]
+        self._changed()
+
+    def url_options(self):
+        # torrents_add arguments for http(s) URLs; pass the tag to submit_urls once added
+        if not self.enabled:
+            return {}
+        return {'is_paused': True, 'tags': f"{URL_TAG_PREFIX}{uuid.uuid4().hex[:12]}"}
+
+    def submit_urls(self, chat_id, options, count, priority=0):
+        if not self.enabled:
+            return
+        self.unresolved[options['tags']] = [chat_id, priority, count, time.time()]
+        self._changed()
+
+    def _resolve(self, changed):
+        for torrent_hash, changes in changed.items():
+            for tag in (tag.strip() for tag in changes.get('tags', '').split(',')):
+                entry = self.unresolved.get(tag)
+                if entry is None:
+                    continue
+                chat_id, priority = entry[:2]
+                self.queued.setdefault(torrent_hash, [chat_id, priority, next(self.sequence)])
+                self.untag.setdefault(tag, []).append(torrent_hash)
+                entry[2] -= 1
+                if entry[2] <= 0:
+                    del self.unresolved[tag]
+                self._changed()
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change()
+
+    def on_torrents_changed(self, changed, removed):
+        for torrent_hash in removed:
+            self.queued.pop(torrent_hash, None)
+            self.active.pop(torrent_hash, None)
+            self.stalled_since.pop(torrent_hash, None)
+            self.released_at.pop(torrent_hash, None)
+        if self.unresolved:
+            self._resolve(changed)
+
+    def snapshot(self):
+        return {'queued': self.queued, 'active': self.active, 'unresolved': self.unresolved}
+
+    def restore(self, data, age):
+        self.queued.update(data['queued'])
+        self.active.update(data['active'])
+        self.unresolved.update(data.get('unresolved', {}))
+        self.sequence = itertools.count(max((entry[2] for entry in self.queued.values()), default=-1) + 1)
+
+    def _free_space(self, torrents):
+        # node name -> bytes that may still be committed to new downloads
+        budgets = {}
+        for node in self.torrent_cache.nodes:
+            free_space = node.cache.server_state.get('free_space_on_disk')
+            if free_space is not None:
+                budgets[node.name] = free_space - self.reserve
+        for torrent_hash in self.active:
+            torrent = torrents.get(torrent_hash, {})
+            if torrent.get('node') in budgets:
+                budgets[torrent['node']] -= torrent.get('amount_left', 0)
+        return budgets
+
+    def _ready_groups(self, torrents):
+        # Torrents whose size is known, grouped by (chat, category), highest priority first
+        groups = {}
+        for torrent_hash, (chat_id, priority, sequence) in self.queued.items():
+            torrent = torrents.get(torrent_hash)
+            if torrent is None or torrent.get('state') not in WAITING_STATES or not torrent.get('total_size', torrent.get('size', 0)):
+                continue
+            key = (chat_id, torrent.get('category', ''))
+            groups.setdefault(key, []).append((-priority, sequence, torrent_hash))
+        return [sorted(group, reverse=True) for _, group in sorted(groups.items(), key=lambda item: min(item[1]))]
+
+    def _yield_stalled(self, torrents, now):
+        # Stalled downloads give their slot back when something is waiting
+        stalled = []
+        for torrent_hash in self.active:
+            if torrents.get(torrent_hash, {}).get('state') not in STALLED_STATES:
+                self.stalled_since.pop(torrent_hash, None)
+                continue
+            since = self.stalled_since.setdefault(torrent_hash, now)
+            if now - since >= self.stall_timeout:
+                stalled.append(torrent_hash)
+        if not stalled or not self._ready_groups(torrents):
+            return []
+        for torrent_hash in stalled:
+            self.stalled_since.pop(torrent_hash, None)
+            chat_id, priority = self.active.pop(torrent_hash)
+            self.queued[torrent_hash] = [chat_id, priority, next(self.sequence)]
+        return stalled
+
+    def _select(self, torrents):
+        budgets = self._free_space(torrents)
+        free_slots = self.slots - len(self.active)
+        groups = self._ready_groups(torrents)
+        released = []
+        # One torrent per group per round, so a single user cannot take every slot
+        while free_slots > 0 and groups:
+            for group in list(groups):
+                if free_slots <= 0:
+                    break
+                torrent_hash = group.pop()[2]
+                if not group:
+                    groups.remove(group)
+                torrent = torrents[torrent_hash]
+                needed = torrent.get('amount_left') or torrent.get('total_size', torrent.get('size', 0))
+                node = torrent.get('node')
+                if node in budgets:
+                    if needed > budgets[node]:
+                        continue
+                    budgets[node] -= needed
+                released.append(torrent_hash)
+                free_slots -= 1
+        return released
+
+    def _paused_by_user(self, torrent_hash, torrent):
+        # Still paused in a sync a full interval after the scheduler's own resume,
+        # so a sync that was in flight during the resume cannot release the slot
+        node = self.torrent_cache.owner(torrent_hash)
+        if torrent.get('state') not in WAITING_STATES or node is None or node.cache.updated_at is None:
+            return False
+        return node.cache.updated_at - self.released_at.get(torrent_hash, float('-inf')) > self.interval
+
+    async def _clean_up_tags(self):
+        now = time.time()
+        for tag, entry in list(self.unresolved.items()):
+            if now - entry[3] > URL_RESOLVE_TIMEOUT:
+                logger.warning(f"{entry[2]} torrent URL(s) added by chat {entry[0]} never showed up in qBittorrent")
+                del self.unresolved[tag]
+                self.untag.setdefault(tag, [])
+        for tag, torrent_hashes in list(self.untag.items()):
+            if torrent_hashes:
+                await self.aqb.torrents_remove_tags(tags=tag, torrent_hashes='|'.join(torrent_hashes))
+            if tag not in self.unresolved:
+                for node in self.torrent_cache.nodes:
+                    await node.aqb.torrents_delete_tags(tags=tag)
+            del self.untag[tag]
+
+    async def tick(self):
+        await self.torrent_cache.ensure_fresh()
+        torrents = self.torrent_cache.torrents
+        before = len(self.active)
+        for torrent_hash in list(self.active):
+            torrent = torrents.get(torrent_hash)
+            if torrent is not None and (torrent.get('progress', 0) >= 1 or self._paused_by_user(torrent_hash, torrent)):
+                del self.active[torrent_hash]
+                self.stalled_since.pop(torrent_hash, None)
+                self.released_at.pop(torrent_hash, None)
+        await self._clean_up_tags()
+
+        paused = self._yield_stalled(torrents, time.monotonic())
+        if paused:
+            await self.aqb.torrents_pause(torrent_hashes='|'.join(paused))
+            logger.info(f"Paused {len(paused)} stalled download(s) to free their slots")
+
+        released = self._select(torrents)
+        if released:
+            await self.aqb.torrents_resume(torrent_hashes='|'.join(released))
+            released_at = time.monotonic()
+            for torrent_hash in released:
+                self.active[torrent_hash] = self.queued.pop(torrent_hash)[:2]
+                self.released_at[torrent_hash] = released_at
+            logger.info(f"Started {len(released)} queued download(s), {len(self.queued)} still waiting")
+        if paused or released or before != len(self.active):
+            self._changed()
+
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.warning(f"Download scheduler tick failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
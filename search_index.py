@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import re
+from bisect import bisect_left, insort
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'[^\W_]+')
+# Trigram similarity (shared / all trigrams) a vocabulary word needs to match a misspelt term
+FUZZY_THRESHOLD = 0.3
+# Torrents restored from the snapshot between two yields to the event loop
+RESTORE_CHUNK = 500
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.casefold())
+
+
+def trigrams(token):
+    padded = f' {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Inverted index over torrent names and file paths. Every name and every path
+# is one document; a token maps to the documents containing it. Each query
+# term matches words it is a prefix of, or, when nothing starts with it,
+# words sharing enough trigrams (typos). Documents must match every term.
+class SearchIndex:
+    def __init__(self):
+        self.next_id = 0
+        # doc id -> (torrent hash, path or None for the torrent name)
+        self.docs = {}
+        self.doc_tokens = {}
+        self.by_torrent = {}
+        self.postings = {}
+        self.vocabulary = []
+        self.trigram_tokens = {}
+        self.names = {}
+        self.file_paths = {}
+        # Names and file lists not indexed yet: {'names': {...}, 'files': {...}}.
+        # Everything arriving before load_pending (snapshot sections, the
+        # restored torrent table) is queued, so startup never tokenizes inline.
+        self.pending = {'names': {}, 'files': {}}
+
+    @property
+    def loading(self):
+        return self.pending is not None
+
+    def _add_doc(self, torrent_hash, path, text):
+        doc_id = self.next_id
+        self.next_id += 1
+        tokens = set(tokenize(text))
+        self.docs[doc_id] = (torrent_hash, path)
+        self.doc_tokens[doc_id] = tokens
+        self.by_torrent.setdefault(torrent_hash, set()).add(doc_id)
+        for token in tokens:
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = set()
+                insort(self.vocabulary, token)
+                for trigram in trigrams(token):
+                    self.trigram_tokens.setdefault(trigram, set()).add(token)
+            postings.add(doc_id)
+
+    def _remove_doc(self, doc_id):
+        torrent_hash, _ = self.docs.pop(doc_id)
+        self.by_torrent[torrent_hash].discard(doc_id)
+        for token in self.doc_tokens.pop(doc_id):
+            postings = self.postings[token]
+            postings.discard(doc_id)
+            if not postings:
+                del self.postings[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+                for trigram in trigrams(token):
+                    self.trigram_tokens[trigram].discard(token)
+                    if not self.trigram_tokens[trigram]:
+                        del self.trigram_tokens[trigram]
+
+    def _remove_docs(self, torrent_hash, files):
+        for doc_id in [doc_id for doc_id in self.by_torrent.get(torrent_hash, ()) if (self.docs[doc_id][1] is not None) == files]:
+            self._remove_doc(doc_id)
+
+    def set_name(self, torrent_hash, name):
+        if self.names.get(torrent_hash) == name:
+            return False
+        self._remove_docs(torrent_hash, files=False)
+        self.names[torrent_hash] = name
+        self._add_doc(torrent_hash, None, name)
+        return True
+
+    def set_files(self, torrent_hash, paths):
+        paths = sorted(paths)
+        if self.file_paths.get(torrent_hash) == paths:
+            return False
+        self._remove_docs(torrent_hash, files=True)
+        self.file_paths[torrent_hash] = paths
+        for path in paths:
+            self._add_doc(torrent_hash, path, path)
+        return True
+
+    def remove_torrent(self, torrent_hash):
+        for doc_id in list(self.by_torrent.get(torrent_hash, ())):
+            self._remove_doc(doc_id)
+        self.by_torrent.pop(torrent_hash, None)
+        self.names.pop(torrent_hash, None)
+        self.file_paths.pop(torrent_hash, None)
+
+    def _term_docs(self, term, fuzzy):
+        docs = set()
+        i = bisect_left(self.vocabulary, term)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+            docs |= self.postings[self.vocabulary[i]]
+            i += 1
+        if docs or not fuzzy or len(term) < 3:
+            return docs
+        wanted = trigrams(term)
+        counts = {}
+        for trigram in wanted:
+            for token in self.trigram_tokens.get(trigram, ()):
+                counts[token] = counts.get(token, 0) + 1
+        for token, shared in counts.items():
+            if shared / len(wanted | trigrams(token)) >= FUZZY_THRESHOLD:
+                docs |= self.postings[token]
+        return docs
+
+    def search(self, query, limit=20, fuzzy=True):
+        # Returns [(torrent_hash, name_matched, [matching paths])], best first
+        terms = sorted(set(tokenize(query)), key=len, reverse=True)
+        if not terms:
+            return []
+        docs = None
+        for term in terms:
+            term_docs = self._term_docs(term, fuzzy)
+            docs = term_docs if docs is None else docs & term_docs
+            if not docs:
+                return []
+
+        results = {}
+        for doc_id in docs:
+            torrent_hash, path = self.docs[doc_id]
+            if torrent_hash not in self.names:
+                continue
+            result = results.setdefault(torrent_hash, [False, []])
+            if path is None:
+                result[0] = True
+            else:
+                result[1].append(path)
+        ranked = sorted(results.items(), key=lambda item: (not item[1][0], -len(item[1][1]), self.names.get(item[0], '')))
+        return [(torrent_hash, name_matched, sorted(paths)) for torrent_hash, (name_matched, paths) in ranked[:limit]]
+
+    def on_torrents_changed(self, changed, removed):
+        for torrent_hash in removed:
+            self.remove_torrent(torrent_hash)
+            if self.pending is not None:
+                self.pending['names'].pop(torrent_hash, None)
+                self.pending['files'].pop(torrent_hash, None)
+        for torrent_hash, changes in changed.items():
+            if 'name' not in changes:
+                continue
+            if self.pending is not None:
+                self.pending['names'][torrent_hash] = changes['name']
+            else:
+                self.set_name(torrent_hash, changes['name'])
+
+    def on_files_fetched(self, torrent_hash, files):
+        if files is None:
+            # Paths may have changed (rename, move); the crawler fetches them again
+            self._remove_docs(torrent_hash, files=True)
+            self.file_paths.pop(torrent_hash, None)
+            if self.pending is not None:
+                self.pending['files'].pop(torrent_hash, None)
+            return
+        # A fetch finishing after the torrent was removed must not bring it back
+        if torrent_hash not in self.names and (self.pending is None or torrent_hash not in self.pending['names']):
+            return
+        if self.pending is not None:
+            self.pending['files'].pop(torrent_hash, None)
+        self.set_files(torrent_hash, [file['name'] for file in files])
+
+    def snapshot(self):
+        return {'names': self.names, 'files': self.file_paths}
+
+    def restore(self, data, age):
+        # Indexed later by load_pending; names queued from the torrent table are newer and win
+        if self.pending is None:
+            self.pending = {'names': {}, 'files': {}}
+        self.pending['names'] = {**data['names'], **self.pending['names']}
+        files = {torrent_hash: paths for torrent_hash, paths in data['files'].items() if torrent_hash not in self.file_paths}
+        self.pending['files'] = {**files, **self.pending['files']}
+
+    async def load_pending(self):
+        # Chunks of names and file lists, yielding to the event loop in between;
+        # changes queued meanwhile are picked up before loading ends
+        if self.pending is None:
+            return
+        while self.pending['names'] or self.pending['files']:
+            for key, apply in (('names', self.set_name), ('files', self.set_files)):
+                items = self.pending[key]
+                for torrent_hash, value in [items.popitem() for _ in range(min(RESTORE_CHUNK, len(items)))]:
+                    apply(torrent_hash, value)
+            await asyncio.sleep(0)
+        self.pending = None
+
+
+# Loads the restored snapshot into the search index, then fills it with the
+# file lists of torrents it has not seen yet, a batch at a time, so a library
+# is crawled once and afterwards kept current from the torrent and file caches.
+class SearchIndexer:
+    def __init__(self, search_index, torrent_cache, file_cache, batch_size=50, interval=30):
+        self.search_index = search_index
+        self.torrent_cache = torrent_cache
+        self.file_cache = file_cache
+        self.batch_size = batch_size
+        self.interval = interval
+        self._task = None
+
+    async def crawl(self):
+        # Torrents whose file list could not be fetched are retried on the next run
+        missing = [torrent_hash for torrent_hash in self.torrent_cache.torrents if torrent_hash not in self.search_index.file_paths]
+        for i in range(0, len(missing), self.batch_size):
+            await self.file_cache.get_many(missing[i:i + self.batch_size])
+
+    async def run(self):
+        while True:
+            try:
+                await self.search_index.load_pending()
+                await self.torrent_cache.ensure_fresh()
+                await self.crawl()
+            except Exception as e:
+                logger.warning(f"Search index crawl failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+logger = logging.getLogger(__name__)
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+# Attempts for transient network errors, RetryAfter is always honoured
+MAX_ATTEMPTS = 4
+
+
+def _seconds(retry_after):
+    return retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+
+
+def split_text(text, limit=MAX_MESSAGE_LENGTH):
+    # Cut on line boundaries where possible so each part fits one message
+    parts = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit)
+        if cut <= 0:
+            cut = limit
+        parts.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    parts.append(text)
+    return parts
+
+
+def _log_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Failed to send message: {task.exception()}")
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Outgoing:
+    def __init__(self, kind, chat_id, text, kwargs, message_id=None, coalesce=True):
+        self.kind = kind
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.message_id = message_id
+        self.coalesce = coalesce
+        self.futures = [asyncio.get_running_loop().create_future()]
+
+    @property
+    def coalescable(self):
+        return self.kind == 'send' and self.coalesce and not self.kwargs
+
+
+# A sent message whose edits also go through the queue
+class QueuedMessage:
+    def __init__(self, send_queue, message):
+        self.send_queue = send_queue
+        self.message = message
+        self.chat_id = message.chat_id
+        self.message_id = message.message_id
+
+    async def edit_text(self, text, **kwargs):
+        return await self.send_queue.edit(self.chat_id, self.message_id, text, **kwargs)
+
+
+# Outbound Telegram traffic: a global token bucket (30 msg/s) and one bucket
+# per chat (1 msg/s). Plain-text messages waiting for the same chat are merged
+# into one message up to the size limit, unless sent with coalesce=False
+# because they are edited later. Repeated edits of one message collapse into
+# the latest, and RetryAfter pauses the chat for the requested time.
+class SendQueue:
+    def __init__(self, global_rate=30, per_chat_rate=1):
+        self.bot = None
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.chat_buckets = {}
+        self.pending = {}
+        self.workers = {}
+
+    def start(self, bot):
+        self.bot = bot
+
+    def depth(self):
+        return sum(len(items) for items in self.pending.values())
+
+    def _enqueue(self, item):
+        self.pending.setdefault(item.chat_id, deque()).append(item)
+        if item.chat_id not in self.workers:
+            self.workers[item.chat_id] = asyncio.create_task(self._drain(item.chat_id))
+        return item.futures[0]
+
+    async def send(self, chat_id, text, coalesce=True, **kwargs):
+        # A keyboard goes on the last part, the message that is returned for later
+        # edits; pass coalesce=False when editing it, or the edit would replace
+        # every queued message merged into it
+        if not text.strip():
+            raise ValueError('Cannot send an empty message')
+        parts = split_text(text)
+        part_kwargs = {key: value for key, value in kwargs.items() if key != 'reply_markup'}
+        futures = [
+            self._enqueue(Outgoing('send', chat_id, part, kwargs if i == len(parts) - 1 else part_kwargs, coalesce=coalesce))
+            for i, part in enumerate(parts)
+        ]
+        messages = await asyncio.gather(*futures)
+        return QueuedMessage(self, messages[-1])
+
+    def send_nowait(self, chat_id, text, **kwargs):
+        # For background notifications that nobody awaits
+        task = asyncio.ensure_future(self.send(chat_id, text, **kwargs))
+        task.add_done_callback(_log_failure)
+        return task
+
+    async def edit(self, chat_id, message_id, text, **kwargs):
+        return await self._enqueue(Outgoing('edit', chat_id, text[:MAX_MESSAGE_LENGTH], kwargs, message_id))
+
+    async def send_document(self, chat_id, document, filename, **kwargs):
+        # document is bytes rather than a file object so a retried upload can send it again
+        return await self._enqueue(Outgoing('document', chat_id, None, dict(kwargs, document=document, filename=filename)))
+
+    async def reply(self, update, text, coalesce=True, **kwargs):
+        return await self.send(update.effective_chat.id, text, coalesce, **kwargs)
+
+    def _next_batch(self, items):
+        item = items.popleft()
+        if item.coalescable:
+            while items and items[0].coalescable and len(item.text) + 2 + len(items[0].text) <= MAX_MESSAGE_LENGTH:
+                following = items.popleft()
+                item.text = f"{item.text}\n\n{following.text}"
+                item.futures.extend(following.futures)
+        elif item.kind == 'edit':
+            # Only the latest content of a message matters
+            while items and items[0].kind == 'edit' and items[0].message_id == item.message_id:
+                following = items.popleft()
+                following.futures.extend(item.futures)
+                item = following
+        return item
+
+    async def _deliver(self, item):
+        bucket = self.chat_buckets.get(item.chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[item.chat_id] = TokenBucket(self.per_chat_rate)
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                if item.kind == 'send':
+                    return await self.bot.send_message(item.chat_id, item.text, **item.kwargs)
+                if item.kind == 'document':
+                    return await self.bot.send_document(item.chat_id, **item.kwargs)
+                return await self.bot.edit_message_text(item.text, chat_id=item.chat_id, message_id=item.message_id, **item.kwargs)
+            except RetryAfter as e:
+                logger.info(f"Flood limit hit for chat {item.chat_id}, retrying in {e.retry_after}s")
+                await asyncio.sleep(_seconds(e.retry_after))
+            except (TimedOut, NetworkError) as e:
+                attempt += 1
+                # BadRequest is a NetworkError subclass but retrying cannot fix it, and a
+                # timed-out send may have been delivered, so only edits retry TimedOut
+                if isinstance(e, BadRequest) or (isinstance(e, TimedOut) and item.kind != 'edit') or attempt >= MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+
+    async def _drain(self, chat_id):
+        items = self.pending[chat_id]
+        try:
+            while items:
+                item = self._next_batch(items)
+                try:
+                    result = await self._deliver(item)
+                except Exception as e:
+                    for future in item.futures:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for future in item.futures:
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            del self.workers[chat_id]
+            if not items:
+                del self.pending[chat_id]
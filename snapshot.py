@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+import pickle
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _write(path, payload):
+    partial_path = path + '.tmp'
+    with open(partial_path, 'wb') as f:
+        f.write(payload)
+    os.replace(partial_path, path)
+
+
+# Saves in-memory state (torrent cache, notifier bookkeeping...) to one pickle
+# file so a restart does not begin cold. Sections register a snapshot() and a
+# restore(data, age) callable; changes only mark the store dirty and a timer
+# writes everything at most once per `interval`, off the event loop. Loading
+# reads and unpickles on a worker thread and yields between sections.
+class SnapshotStore:
+    def __init__(self, path, interval=30):
+        self.path = path
+        self.interval = interval
+        self.sections = {}
+        self.dirty = False
+        self._task = None
+
+    def register(self, name, snapshot, restore):
+        # Sections are restored in registration order
+        self.sections[name] = (snapshot, restore)
+
+    def mark_dirty(self):
+        self.dirty = True
+
+    async def load(self):
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(None, _read, self.path)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Could not read snapshot {self.path}: {e}")
+            return
+        age = max(0.0, time.time() - data.get('saved_at', 0))
+        for name, (snapshot, restore) in self.sections.items():
+            if name not in data:
+                continue
+            try:
+                restore(data[name], age)
+            except Exception as e:
+                logger.warning(f"Could not restore {name} from snapshot: {e}")
+            await asyncio.sleep(0)
+        logger.info(f"Restored state from {self.path} ({age:.0f}s old)")
+
+    async def save(self):
+        # Pickled on the loop so the state cannot change halfway, written on a worker thread
+        self.dirty = False
+        data = {name: snapshot() for name, (snapshot, restore) in self.sections.items()}
+        data['saved_at'] = time.time()
+        payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        await asyncio.get_running_loop().run_in_executor(None, _write, self.path, payload)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.dirty:
+                continue
+            try:
+                await self.save()
+            except Exception as e:
+                self.dirty = True
+                logger.warning(f"Could not write snapshot {self.path}: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.dirty:
+            await self.save()
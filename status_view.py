@@ -0,0 +1,95 @@
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+
+# qBittorrent torrent states behind each /status filter
+STATUS_FILTERS = {
+    'all': None,
+    'downloading': {'downloading', 'metaDL', 'forcedMetaDL', 'forcedDL', 'allocating', 'queuedDL', 'checkingDL'},
+    'seeding': {'uploading', 'forcedUP', 'queuedUP', 'checkingUP', 'stalledUP'},
+    'stalled': {'stalledDL', 'stalledUP'},
+    'errored': {'error', 'missingFiles', 'unknown'},
+}
+
+
+def create_progress_bar(progress, length=20):
+    full_block = "█"
+    empty_block = "░"
+    filled_length = int(length * progress)
+    return full_block * filled_length + empty_block * (length - filled_length)
+
+
+def render_torrent(torrent):
+    progress = torrent.get('progress', 0)
+    return (
+        f"Name: {torrent.get('name', torrent['hash'])}\n"
+        f"Progress: {progress*100:.2f}% [{create_progress_bar(progress)}]\n"
+        f"State: {torrent.get('state', 'unknown')}\n"
+    )
+
+
+# Paginated /status rendering. Each torrent's text is cached and only
+# re-rendered when its name, progress or state changes; pages are cut so the
+# message never exceeds Telegram's size limit.
+class StatusView:
+    def __init__(self, page_size=20):
+        self.page_size = page_size
+        self.lines = {}
+
+    def on_torrents_changed(self, changed, removed):
+        for torrent_hash in removed:
+            self.lines.pop(torrent_hash, None)
+
+    def line(self, torrent):
+        key = (torrent.get('name'), torrent.get('progress'), torrent.get('state'))
+        cached = self.lines.get(torrent['hash'])
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        line = render_torrent(torrent)
+        self.lines[torrent['hash']] = (key, line)
+        return line
+
+    def _paginate(self, lines, budget):
+        pages = []
+        start, size = 0, 0
+        for i, line in enumerate(lines):
+            # +1 for the blank line that separates torrents
+            if i > start and (i - start >= self.page_size or size + len(line) + 1 > budget):
+                pages.append((start, i))
+                start, size = i, 0
+            size += len(line) + 1
+        pages.append((start, len(lines)))
+        return pages
+
+    def render(self, torrents, status_filter='all', page=0):
+        # Returns (text, reply_markup)
+        states = STATUS_FILTERS.get(status_filter)
+        if states is not None:
+            torrents = [torrent for torrent in torrents if torrent.get('state') in states]
+        torrents = sorted(torrents, key=lambda torrent: torrent.get('name', '').casefold())
+        if not torrents:
+            return f"No {status_filter} torrents." if status_filter != 'all' else 'No active torrents.', self.keyboard(status_filter, 0, 1)
+
+        lines = [self.line(torrent) for torrent in torrents]
+        # Leave room for the header line
+        pages = self._paginate(lines, MAX_MESSAGE_LENGTH - 100)
+        page = max(0, min(page, len(pages) - 1))
+        start, end = pages[page]
+        header = f"{len(torrents)} {status_filter} torrents, page {page + 1}/{len(pages)}\n\n"
+        text = header + "\n".join(lines[start:end])
+        return text[:MAX_MESSAGE_LENGTH], self.keyboard(status_filter, page, len(pages))
+
+    @staticmethod
+    def keyboard(status_filter, page, page_count):
+        filter_row = [
+            InlineKeyboardButton(('• ' if name == status_filter else '') + name, callback_data=f"status:{name}:0")
+            for name in STATUS_FILTERS
+        ]
+        nav_row = []
+        if page > 0:
+            nav_row.append(InlineKeyboardButton('‹ Prev', callback_data=f"status:{status_filter}:{page - 1}"))
+        nav_row.append(InlineKeyboardButton('⟳', callback_data=f"status:{status_filter}:{page}"))
+        if page < page_count - 1:
+            nav_row.append(InlineKeyboardButton('Next ›', callback_data=f"status:{status_filter}:{page + 1}"))
+        return InlineKeyboardMarkup([filter_row[:3], filter_row[3:], nav_row])
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+
+from metrics import CACHE_REQUESTS
+from torrent_index import TorrentIndex
+
+logger = logging.getLogger(__name__)
+
+
+# In-memory torrent table kept current through qBittorrent's /sync/maindata
+# endpoint. Only the fields that changed since the last `rid` are transferred,
+# so a refresh costs the size of the delta rather than the size of the library.
+class TorrentCache:
+    def __init__(self, aqb, refresh_interval=5, max_staleness=15):
+        self.aqb = aqb
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.rid = 0
+        self.torrents = {}
+        self.server_state = {}
+        self.index = TorrentIndex()
+        self.listeners = []
+        self.updated_at = None
+        # False until qBittorrent has answered once; a restored table does not count
+        self.synced = False
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    def is_stale(self, max_age=None):
+        if self.updated_at is None:
+            return True
+        if max_age is None:
+            max_age = self.max_staleness
+        return time.monotonic() - self.updated_at > max_age
+
+    async def refresh(self, max_age=None):
+        async with self._lock:
+            # Another caller may have refreshed while we were waiting for the lock
+            if max_age is not None and not self.is_stale(max_age):
+                return
+            data = await self.aqb.sync_maindata(rid=self.rid)
+            self._apply(data)
+            self.synced = True
+
+    def add_listener(self, callback):
+        # callback(changed, removed) runs after every delta; `changed` maps
+        # hash -> the fields that changed and `removed` lists dropped hashes
+        self.listeners.append(callback)
+
+    def _notify(self, changed, removed):
+        for callback in self.listeners:
+            try:
+                callback(changed, removed)
+            except Exception as e:
+                logger.exception(f"Torrent cache listener failed: {e}")
+
+    def _apply(self, data):
+        removed = list(data.get('torrents_removed') or ())
+        previous = {}
+        if data.get('full_update'):
+            removed.extend(self.torrents)
+            # Surviving torrents keep their dict, others (the merged pool
+            # table, running moves) may hold a reference to it
+            previous = self.torrents
+            self.torrents = {}
+            self.server_state = {}
+            self.index.clear()
+
+        changed = {}
+        names = []
+        for torrent_hash, changes in (data.get('torrents') or {}).items():
+            changes = dict(changes)
+            torrent = self.torrents.get(torrent_hash)
+            if torrent is None:
+                torrent = self.torrents[torrent_hash] = previous.get(torrent_hash) or {'hash': torrent_hash}
+            torrent.update(changes)
+            changed[torrent_hash] = changes
+            if 'name' in changes:
+                names.append((torrent_hash, changes['name']))
+        self.index.add_many(names)
+
+        for torrent_hash in data.get('torrents_removed') or ():
+            self.torrents.pop(torrent_hash, None)
+            self.index.remove(torrent_hash)
+        # A full update re-lists surviving torrents, so they are not removals
+        removed = [torrent_hash for torrent_hash in dict.fromkeys(removed) if torrent_hash not in self.torrents]
+
+        self.server_state.update(data.get('server_state') or {})
+        self.rid = data.get('rid', self.rid)
+        self.updated_at = time.monotonic()
+        self._notify(changed, removed)
+
+    async def ensure_fresh(self, max_age=None):
+        if max_age is None:
+            max_age = self.max_staleness
+        if self.is_stale(max_age):
+            CACHE_REQUESTS.inc(cache='torrents', result='miss')
+            await self.refresh(max_age)
+        else:
+            CACHE_REQUESTS.inc(cache='torrents', result='hit')
+
+    async def get_torrents(self, max_age=None):
+        await self.ensure_fresh(max_age)
+        return list(self.torrents.values())
+
+    async def find(self, query, max_age=None):
+        # Resolve a full or 8+ character hash prefix, exact name or name prefix
+        await self.ensure_fresh(max_age)
+        return [self.torrents[torrent_hash] for torrent_hash in self.index.lookup(query)]
+
+    def snapshot(self):
+        return {'torrents': self.torrents, 'server_state': self.server_state}
+
+    def restore(self, data, age):
+        # Serve the saved table until the first sync; rid stays 0 so that sync
+        # is a full update and drops anything removed while we were down
+        self._apply({'full_update': True, 'torrents': data['torrents'], 'server_state': data['server_state']})
+        self.rid = 0
+        self.updated_at = time.monotonic() - age
+
+    def discard(self, torrent_hashes):
+        # Drop torrents we just deleted without waiting for the next delta
+        removed = [torrent_hash for torrent_hash in torrent_hashes if self.torrents.pop(torrent_hash, None) is not None]
+        for torrent_hash in removed:
+            self.index.remove(torrent_hash)
+        if removed:
+            self._notify({}, removed)
+
+    async def run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Torrent cache refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,151 @@
+import fnmatch
+import operator
+import re
+import time
+
+from status_view import STATUS_FILTERS
+
+# Parsing of `key=value` arguments that narrow a command down to a subset of torrents
+SCOPE_KEYS = ('category', 'tag', 'path')
+
+
+def parse_scope(args):
+    # Splits command arguments into positional values and a scope dict
+    positional = []
+    scope = {}
+    for arg in args:
+        key, sep, value = arg.partition('=')
+        if sep and key in SCOPE_KEYS:
+            scope[key] = value
+        else:
+            positional.append(arg)
+    return positional, scope
+
+
+def matches_scope(torrent, scope):
+    if 'category' in scope and torrent.get('category', '') != scope['category']:
+        return False
+    if 'tag' in scope:
+        tags = [tag.strip() for tag in torrent.get('tags', '').split(',')]
+        if scope['tag'] not in tags:
+            return False
+    if 'path' in scope and not torrent.get('save_path', '').startswith(scope['path']):
+        return False
+    return True
+
+
+# Filter expressions for bulk commands, e.g. `state=seeding ratio>=2 age>30d`
+FILTER_EXPRESSION = re.compile(r'^(state|ratio|age|size|progress|category|tag|path|name)(>=|<=|!=|=|>|<)(.+)$')
+NUMERIC_KEYS = ('ratio', 'age', 'size', 'progress')
+DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+SIZE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+COMPARISONS = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+}
+
+
+def is_filter_expression(arg):
+    return FILTER_EXPRESSION.match(arg) is not None
+
+
+def _parse_number(key, value):
+    value = value.strip().lower()
+    if key == 'size':
+        value = value.rstrip('ib')
+    if not value:
+        raise ValueError(f"'{key}' needs a number")
+    if key == 'age':
+        unit = value[-1] if value[-1] in DURATION_UNITS else 's'
+        return float(value.rstrip(''.join(DURATION_UNITS))) * DURATION_UNITS[unit]
+    if key == 'size':
+        unit = value[-1] if value[-1] in SIZE_UNITS else ''
+        return float(value[:-1] if unit else value) * SIZE_UNITS[unit]
+    if key == 'progress':
+        # Percent, like /status shows it
+        return float(value.rstrip('%')) / 100
+    return float(value)
+
+
+def parse_filters(args):
+    # Returns a list of (key, comparison, value); raises ValueError on bad input
+    filters = []
+    for arg in args:
+        match = FILTER_EXPRESSION.match(arg)
+        if match is None:
+            raise ValueError(f"Not a filter expression: {arg}")
+        key, op, value = match.groups()
+        if key in NUMERIC_KEYS:
+            try:
+                value = _parse_number(key, value)
+            except ValueError:
+                raise ValueError(f"Not a valid number in {arg}, use e.g. ratio>=2 age>30d size>4g progress<50%") from None
+        elif op not in ('=', '!='):
+            raise ValueError(f"'{key}' only supports = and !=")
+        filters.append((key, op, value))
+    return filters
+
+
+def _field(torrent, key, now):
+    if key == 'age':
+        return now - torrent.get('added_on', now)
+    if key == 'size':
+        return torrent.get('size', 0)
+    return torrent.get(key, 0)
+
+
+def _matches_text(torrent, key, value):
+    if key == 'state':
+        states = STATUS_FILTERS.get(value)
+        if states is None:
+            # 'all' or a raw qBittorrent state name
+            return value == 'all' or torrent.get('state') == value
+        return torrent.get('state') in states
+    if key == 'tag':
+        return value in [tag.strip() for tag in torrent.get('tags', '').split(',')]
+    if key == 'path':
+        return torrent.get('save_path', '').startswith(value)
+    if key == 'name':
+        return fnmatch.fnmatchcase(torrent.get('name', '').casefold(), value.casefold())
+    return torrent.get(key, '') == value
+
+
+def matches_filters(torrent, filters, now=None):
+    now = time.time() if now is None else now
+    for key, op, value in filters:
+        if key in NUMERIC_KEYS:
+            if not COMPARISONS[op](_field(torrent, key, now), value):
+                return False
+        elif _matches_text(torrent, key, value) != (op == '='):
+            return False
+    return True
+
+
+def is_exact_selection(args, torrents):
+    # True when the arguments named one torrent by its full hash or exact name,
+    # not by a name prefix, hash prefix or filter
+    query = ' '.join(args).strip().casefold()
+    return len(torrents) == 1 and query in (torrents[0]['hash'].casefold(), torrents[0].get('name', '').casefold())
+
+
+async def select_torrents(torrent_cache, args):
+    # Resolves command arguments against one snapshot of the torrent cache:
+    # either filter expressions or a single name/hash. Returns (torrents, error).
+    if args and all(is_filter_expression(arg) for arg in args):
+        try:
+            filters = parse_filters(args)
+        except ValueError as e:
+            return [], str(e)
+        now = time.time()
+        return [torrent for torrent in await torrent_cache.get_torrents() if matches_filters(torrent, filters, now)], None
+
+    query = ' '.join(args)
+    matches = await torrent_cache.find(query)
+    if len(matches) > 1:
+        names = "\n".join(torrent['name'] for torrent in matches)
+        return [], f"Several torrents match '{query}', please be more specific:\n{names}"
+    return matches, None
@@ -0,0 +1,110 @@
+from bisect import bisect_left, insort
+import string
+
+# Shortest hash prefix accepted in place of a full info-hash
+MIN_HASH_PREFIX = 8
+HEX_DIGITS = frozenset(string.hexdigits)
+# Batches larger than this rebuild the sorted keys with one sort instead of an insort each
+BULK_ADD = 32
+
+
+# Lookup structures over the torrent set: exact hash and case-folded name dicts
+# plus sorted keys for prefix matches, so lookups stay O(1)/O(log n).
+class TorrentIndex:
+    def __init__(self):
+        self.names = {}
+        self.by_name = {}
+        self.sorted_names = []
+        self.sorted_hashes = []
+
+    def clear(self):
+        self.names.clear()
+        self.by_name.clear()
+        self.sorted_names.clear()
+        self.sorted_hashes.clear()
+
+    def add(self, torrent_hash, name):
+        folded = name.casefold()
+        if torrent_hash in self.names:
+            if self.names[torrent_hash] == folded:
+                return
+            self._unlink_name(torrent_hash)
+        else:
+            insort(self.sorted_hashes, torrent_hash)
+        self.names[torrent_hash] = folded
+        hashes = self.by_name.setdefault(folded, set())
+        if not hashes:
+            insort(self.sorted_names, folded)
+        hashes.add(torrent_hash)
+
+    def add_many(self, items):
+        # items: [(torrent_hash, name)], e.g. a full update or a restored snapshot
+        if len(items) <= BULK_ADD:
+            for torrent_hash, name in items:
+                self.add(torrent_hash, name)
+            return
+        for torrent_hash, name in items:
+            folded = name.casefold()
+            previous = self.names.get(torrent_hash)
+            if previous == folded:
+                continue
+            if previous is not None:
+                hashes = self.by_name[previous]
+                hashes.discard(torrent_hash)
+                if not hashes:
+                    del self.by_name[previous]
+            self.names[torrent_hash] = folded
+            self.by_name.setdefault(folded, set()).add(torrent_hash)
+        self.sorted_hashes[:] = sorted(self.names)
+        self.sorted_names[:] = sorted(self.by_name)
+
+    def remove(self, torrent_hash):
+        if torrent_hash in self.names:
+            self._unlink_name(torrent_hash)
+            self._delete_sorted(self.sorted_hashes, torrent_hash)
+
+    def _unlink_name(self, torrent_hash):
+        folded = self.names.pop(torrent_hash)
+        hashes = self.by_name[folded]
+        hashes.discard(torrent_hash)
+        if not hashes:
+            del self.by_name[folded]
+            self._delete_sorted(self.sorted_names, folded)
+
+    @staticmethod
+    def _delete_sorted(keys, key):
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+    @staticmethod
+    def _prefixed(keys, prefix, limit):
+        i = bisect_left(keys, prefix)
+        matches = []
+        while i < len(keys) and keys[i].startswith(prefix) and len(matches) < limit:
+            matches.append(keys[i])
+            i += 1
+        return matches
+
+    def lookup(self, query, limit=20):
+        # Returns matching hashes, most specific match kind first
+        query = query.strip()
+        folded = query.casefold()
+        if not folded:
+            return []
+
+        if folded in self.names:
+            return [folded]
+
+        if folded in self.by_name:
+            return sorted(self.by_name[folded])[:limit]
+
+        if len(folded) >= MIN_HASH_PREFIX and HEX_DIGITS.issuperset(folded):
+            matches = self._prefixed(self.sorted_hashes, folded, limit)
+            if matches:
+                return matches
+
+        hashes = []
+        for name in self._prefixed(self.sorted_names, folded, limit):
+            hashes.extend(sorted(self.by_name[name]))
+        return hashes[:limit]
@@ -0,0 +1,102 @@
+import asyncio
+import base64
+import io
+import logging
+from urllib.parse import parse_qs, urlparse
+
+from bencode import BencodeError, info_hash
+
+logger = logging.getLogger(__name__)
+
+
+def magnet_info_hash(url):
+    # Hex info-hash of a magnet link, or None for plain URLs
+    if not url.startswith('magnet:'):
+        return None
+    for topic in parse_qs(urlparse(url).query).get('xt', []):
+        if topic.startswith('urn:btih:'):
+            value = topic[len('urn:btih:'):]
+            if len(value) == 32:
+                # Base32 form
+                try:
+                    value = base64.b32decode(value.upper()).hex()
+                except ValueError:
+                    return None
+            return value.lower()
+    return None
+
+
+# Collects .torrent documents arriving in a burst (or one media group) from a
+# chat and adds them with a single torrents_add call once the chat has been
+# quiet for `delay` seconds. Files are kept in memory only.
+class UploadBatcher:
+    def __init__(self, aqb, torrent_cache, send_queue, delay=1.5, on_added=None, add_options=None):
+        self.aqb = aqb
+        # on_added(chat_id, hashes) is told which info-hashes a chat added
+        self.on_added = on_added
+        # Extra torrents_add arguments, e.g. to add paused for the scheduler
+        self.add_options = add_options or {}
+        self.torrent_cache = torrent_cache
+        self.send_queue = send_queue
+        self.delay = delay
+        self.batches = {}
+
+    async def add(self, update, document):
+        buffer = io.BytesIO()
+        telegram_file = await document.get_file()
+        await telegram_file.download_to_memory(out=buffer)
+
+        chat_id = update.effective_chat.id
+        batch = self.batches.get(chat_id)
+        if batch is None:
+            batch = self.batches[chat_id] = {'files': {}, 'timer': None}
+        # Keyed by Telegram's file id: two uploads may share a file name
+        name = document.file_name or f"{document.file_unique_id}.torrent"
+        batch['files'][document.file_unique_id] = (name, buffer.getvalue())
+
+        # Restart the quiet period with every new document
+        if batch['timer'] is not None:
+            batch['timer'].cancel()
+        batch['timer'] = asyncio.create_task(self._flush_later(chat_id))
+
+    async def _flush_later(self, chat_id):
+        await asyncio.sleep(self.delay)
+        batch = self.batches.pop(chat_id)
+        try:
+            await self.flush(chat_id, batch['files'])
+        except Exception as e:
+            logger.exception(f"Failed to add uploaded torrents: {e}")
+            await self.send_queue.send(chat_id, f'An error occurred: {e}')
+
+    def _select(self, files):
+        # Parse just far enough to hash the info dictionary for dedup
+        selected, hashes, skipped = {}, [], []
+        for file_id, (name, data) in files.items():
+            try:
+                torrent_hash = info_hash(data)
+            except BencodeError as e:
+                skipped.append(f"{name}: {e}")
+                continue
+            if torrent_hash in self.torrent_cache.torrents or torrent_hash in hashes:
+                skipped.append(f"{name}: already added")
+                continue
+            selected[f"{file_id}.torrent"] = data
+            hashes.append(torrent_hash)
+        return selected, hashes, skipped
+
+    async def flush(self, chat_id, files):
+        await self.torrent_cache.ensure_fresh()
+        selected, hashes, skipped = self._select(files)
+        lines = []
+        if selected:
+            result = await self.aqb.torrents_add(torrent_files=selected, **self.add_options)
+            if result == 'Fails.':
+                lines.append('qBittorrent refused to add the uploaded torrent(s).')
+            else:
+                lines.append(f"{len(selected)} torrent(s) added successfully!")
+                if self.on_added is not None:
+                    self.on_added(chat_id, hashes)
+        if skipped:
+            lines.append("Skipped:\n" + "\n".join(skipped))
+        await self.send_queue.send(chat_id, "\n".join(lines))
+        return hashes
@@ -0,0 +1,61 @@
+import logging
+import secrets
+
+from telegram.ext import BaseUpdateProcessor
+
+from coordination import KeyedLocks
+
+logger = logging.getLogger(__name__)
+
+
+# Runs updates concurrently, but messages from the same chat one after another
+# so conversation steps and consecutive commands keep their order. Button
+# presses (callback queries) are not queued behind a chat's long-running
+# command, so /status pages still turn while a /move_specific is copying.
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    def __init__(self, max_concurrent_updates=64):
+        super().__init__(max_concurrent_updates)
+        self.chat_locks = KeyedLocks()
+
+    async def do_process_update(self, update, coroutine):
+        chat = getattr(update, 'effective_chat', None)
+        if chat is None or getattr(update, 'callback_query', None) is not None:
+            await coroutine
+            return
+
+        # The chat's lock is dropped only once nobody holds or waits for it
+        async with self.chat_locks.hold(chat.id):
+            await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+
+def run(application, mode='polling', webhook_url=None, listen='127.0.0.1', port=8443, url_path='telegram', secret_token=None, unix_socket=None):
+    if mode == 'polling':
+        application.run_polling()
+        return
+    if mode != 'webhook':
+        raise ValueError(f"Unknown BOT_MODE '{mode}', expected 'polling' or 'webhook'")
+    if not webhook_url:
+        raise ValueError("BOT_MODE 'webhook' needs WEBHOOK_URL")
+
+    if not secret_token:
+        # Telegram echoes the token in a header of every request; the webhook is
+        # registered on each start, so a fresh random token works as well
+        secret_token = secrets.token_urlsafe(32)
+    if unix_socket:
+        logger.info(f"Serving webhook on unix socket {unix_socket} for {webhook_url}")
+    else:
+        logger.info(f"Serving webhook on {listen}:{port}/{url_path} for {webhook_url}")
+    application.run_webhook(
+        listen=listen,
+        port=port,
+        url_path=url_path,
+        webhook_url=webhook_url,
+        secret_token=secret_token,
+        unix=unix_socket,
+    )
@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import logging
+import time
+
+from telegram.error import BadRequest, Forbidden
+
+logger = logging.getLogger(__name__)
+
+
+# One live /status message per chat, all refreshed from a single loop that
+# reads the shared torrent cache. An edit is only sent when the rendered
+# content changed and the chat's minimum edit interval has passed; edits go
+# through the send queue, which handles Telegram's flood limits.
+class WatchManager:
+    def __init__(self, send_queue, torrent_cache, status_view, interval=5, min_edit_interval=3):
+        self.send_queue = send_queue
+        self.torrent_cache = torrent_cache
+        self.status_view = status_view
+        self.interval = interval
+        self.min_edit_interval = min_edit_interval
+        self.watchers = {}
+        self._task = None
+
+    def watch(self, chat_id, message_id, status_filter='all'):
+        self.watchers[chat_id] = {
+            'message_id': message_id,
+            'filter': status_filter,
+            'digest': None,
+            'edited_at': 0.0,
+        }
+        self.start()
+
+    def unwatch(self, chat_id):
+        return self.watchers.pop(chat_id, None) is not None
+
+    async def _refresh_chat(self, chat_id, watcher, torrents, now):
+        # The dashboard always shows the first page, so no paging keyboard
+        text, _ = self.status_view.render(torrents, watcher['filter'])
+        digest = hashlib.sha1(text.encode()).digest()
+        if digest == watcher['digest']:
+            return
+        if now - watcher['edited_at'] < self.min_edit_interval:
+            return
+        try:
+            await self.send_queue.edit(chat_id, watcher['message_id'], text)
+            watcher['digest'] = digest
+            watcher['edited_at'] = now
+        except BadRequest as e:
+            if 'not modified' in str(e):
+                watcher['digest'] = digest
+            else:
+                # The dashboard message was deleted or is no longer editable
+                logger.info(f"Stopping /watch in chat {chat_id}: {e}")
+                self.unwatch(chat_id)
+        except Forbidden:
+            self.unwatch(chat_id)
+
+    async def run(self):
+        while self.watchers:
+            try:
+                # One backend poll shared by every watching chat
+                torrents = await self.torrent_cache.get_torrents(max_age=self.interval)
+                now = time.monotonic()
+                await asyncio.gather(*(
+                    self._refresh_chat(chat_id, watcher, torrents, now)
+                    for chat_id, watcher in list(self.watchers.items())
+                ))
+            except Exception as e:
+                logger.warning(f"Watch refresh failed: {e}")
+            await asyncio.sleep(self.interval)
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None